@@ -0,0 +1,129 @@
+"""
+Read/write splitting for PlanWise.
+
+Safe (GET/HEAD) requests read from the ``replica`` database alias and
+everything else goes to ``default``. A request that writes to the primary,
+whatever its method, reads from the primary for the rest of the request, and
+the browser's reads stay there for REPLICA_PIN_SECONDS so users always see
+their own changes. Locally the replica is a copy of the SQLite primary refreshed
+with SQLite's online backup API (python manage.py refresh_replica).
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+PRIMARY_ALIAS = 'default'
+PIN_COOKIE = 'planwise_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+_use_replica = ContextVar('planwise_use_replica', default=False)
+# Per-request {'wrote': bool}, set by ReplicaRoutingMiddleware
+_request_writes = ContextVar('planwise_request_writes', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_available():
+    if not replica_configured():
+        return False
+    name = str(connections[REPLICA_ALIAS].settings_dict['NAME'])
+    # In-memory test databases mirror the primary
+    return name.startswith(('file:', ':memory:')) or os.path.exists(name)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        writes = _request_writes.get()
+        if _use_replica.get() and not (writes and writes['wrote']):
+            return REPLICA_ALIAS
+        return PRIMARY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary when it is refreshed
+        return db == PRIMARY_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        use_replica = (request.method in SAFE_METHODS and not self._pinned(request)
+                       and replica_available())
+        # Pin on the statements the request actually ran, not its method:
+        # some views still write on GET
+        writes = {'wrote': False}
+
+        def note_writes(execute, sql, params, many, context):
+            if sql.lstrip()[:6].upper().startswith(WRITE_STATEMENTS):
+                writes['wrote'] = True
+            return execute(sql, params, many, context)
+
+        token = _request_writes.set(writes)
+        try:
+            with replica_reads(use_replica), connections[PRIMARY_ALIAS].execute_wrapper(note_writes):
+                response = self.get_response(request)
+        finally:
+            _request_writes.reset(token)
+
+        if writes['wrote']:
+            pin_seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + pin_seconds), max_age=pin_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def copy_database(source_path, target_path, pages=-1):
+    # Snapshot with the online backup API into a temporary file, then swap it
+    # in atomically so readers never see a half-written replica. Connections
+    # already open keep reading the previous snapshot until they close.
+    tmp_path = f'{target_path}.tmp'
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp_path, target_path)
+
+
+def refresh_replica():
+    copy_database(
+        settings.DATABASES[PRIMARY_ALIAS]['NAME'],
+        settings.DATABASES[REPLICA_ALIAS]['NAME'],
+    )
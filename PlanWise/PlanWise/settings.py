@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'PlanWise.replica.ReplicaRoutingMiddleware',
+    'tasks.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,9 +82,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent writers
+        # (batch_maintenance workers) wait on the busy timeout instead of
+        # failing with "database is locked" when a read turns into a write
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# Optional read replica: set PLANWISE_REPLICA=1 and keep it fresh with
+# `python manage.py refresh_replica --interval 5`. Safe requests read from it
+# unless the browser wrote within REPLICA_PIN_SECONDS, which should be longer
+# than the refresh interval.
+if os.environ.get('PLANWISE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['PlanWise.replica.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,4 +160,15 @@ MESSAGE_TAGS = {
     messages.SUCCESS: 'alert-success',
     messages.WARNING: 'alert-warning',
     messages.ERROR: 'alert-danger',
-}
\ No newline at end of file
+}
+
+# Due-date reminders (python manage.py send_reminders)
+# Backend is one of: 'console', 'file', 'email' (email is written to files)
+REMINDER_BACKEND = 'console'
+REMINDER_LEAD_HOURS = 24
+REMINDER_FILE_PATH = BASE_DIR / 'reminders'
+
+# Metrics (/metrics/, staff only). With several worker processes set
+# PLANWISE_METRICS_DIR to a directory they share and empty it on deploy;
+# each process writes its own file there and the endpoint sums them.
+METRICS_DIR = os.environ.get('PLANWISE_METRICS_DIR')
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Task, Category
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+from .deletion import delete_user
+from .models import Task, Category, TaskReminder, ArchivedTask
 
 # Register your models here.
 
@@ -15,4 +18,28 @@ class TaskAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description']
     date_hierarchy = 'created_at'
 
+@admin.register(TaskReminder)
+class TaskReminderAdmin(admin.ModelAdmin):
+    list_display = ['task', 'due_date', 'status', 'backend', 'sent_at']
+    list_filter = ['status', 'backend']
+    search_fields = ['task__title']
 
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'category', 'is_completed', 'user', 'archived_at']
+    list_filter = ['is_completed', 'user']
+    search_fields = ['title', 'description']
+
+
+# Users own potentially large task trees; delete those with set-based SQL
+# rather than through the deletion Collector
+admin.site.unregister(User)
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    def delete_model(self, request, obj):
+        delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            delete_user(user)
@@ -0,0 +1,144 @@
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .conditional import get_data_version
+from .metrics import CACHE_REQUESTS
+from .models import Task, Category
+
+DAYS_BACK = 30
+DAYS_AHEAD = 60
+WEEKS_BACK = 12
+WEEKS_AHEAD = 14
+CACHE_TIMEOUT = 60 * 60
+
+
+def load_columns(user):
+    """
+    Pull the columns the rollups need in a single values_list pass and turn
+    them into NumPy arrays: due-date ordinals, category ids (-1 for none),
+    and completed/recurring flags. Recurring occurrences are ordinary task
+    rows, so whole series are included.
+    """
+    rows = list(
+        Task.objects.filter(user=user, due_date__isnull=False)
+        .order_by()
+        .values_list('due_date', 'category_id', 'is_completed', 'is_recurring')
+    )
+    count = len(rows)
+    due = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=count)
+    category = np.fromiter((row[1] if row[1] is not None else -1 for row in rows), dtype=np.int64, count=count)
+    completed = np.fromiter((row[2] for row in rows), dtype=bool, count=count)
+    recurring = np.fromiter((row[3] for row in rows), dtype=bool, count=count)
+    return due, category, completed, recurring
+
+
+def _binned(index, size, weights=None):
+    # Counts per bin for indexes in [0, size), ignoring everything outside
+    mask = (index >= 0) & (index < size)
+    if weights is not None:
+        weights = weights[mask]
+    return np.bincount(index[mask], weights=weights, minlength=size)[:size].astype(np.int64)
+
+
+def _factorize(values):
+    # Like np.unique(return_inverse=True) but with a bincount instead of a
+    # sort when the ids are dense enough, which they are for category ids.
+    if values.size == 0:
+        return values, values
+    low = values.min()
+    span = values.max() - low + 1
+    if span > 4 * values.size + 1024:
+        return np.unique(values, return_inverse=True)
+    shifted = values - low
+    present = np.bincount(shifted, minlength=span) > 0
+    positions = np.cumsum(present) - 1
+    return np.flatnonzero(present) + low, positions[shifted]
+
+
+def rollup_arrays(due, category, completed, recurring, today):
+    today_ordinal = today.toordinal()
+    incomplete = ~completed
+
+    # Tasks due per day around today
+    first_day = today_ordinal - DAYS_BACK
+    n_days = DAYS_BACK + DAYS_AHEAD + 1
+    day_index = due - first_day
+    daily_due = _binned(day_index, n_days)
+    daily_completed = _binned(day_index, n_days, weights=completed)
+
+    # Tasks due per week (Monday based) per category
+    first_week = today_ordinal - today.weekday() - WEEKS_BACK * 7
+    n_weeks = WEEKS_BACK + WEEKS_AHEAD + 1
+    week_index = (due - first_week) // 7
+    category_ids, category_pos = _factorize(category)
+    n_categories = len(category_ids)
+    in_range = (week_index >= 0) & (week_index < n_weeks)
+    weekly = np.bincount(
+        week_index[in_range] * n_categories + category_pos[in_range],
+        minlength=n_weeks * n_categories,
+    ).reshape(n_weeks, n_categories) if n_categories else np.zeros((n_weeks, 0), dtype=np.int64)
+    weekly_recurring = _binned(week_index, n_weeks, weights=recurring)
+
+    # Completion rate per category
+    per_category = np.bincount(category_pos, minlength=n_categories)
+    per_category_done = np.bincount(category_pos, weights=completed, minlength=n_categories)
+
+    # Overdue trend: incomplete tasks already past due on each of the last days
+    trend_days = np.arange(today_ordinal - DAYS_BACK, today_ordinal + 1)
+    open_due = due[incomplete]
+    already_overdue = np.count_nonzero(open_due < trend_days[0])
+    per_day = _binned(open_due - trend_days[0], trend_days.size)
+    overdue_trend = already_overdue + np.concatenate(([0], np.cumsum(per_day)[:-1]))
+
+    total = int(due.size)
+    done = int(completed.sum())
+    return {
+        'totals': {
+            'tasks': total,
+            'completed': done,
+            'overdue': int(np.count_nonzero(incomplete & (due < today_ordinal))),
+            'recurring': int(recurring.sum()),
+            'completion_rate': round(done / total, 4) if total else None,
+        },
+        'daily': {
+            'dates': [date.fromordinal(first_day + i).isoformat() for i in range(n_days)],
+            'due': daily_due.tolist(),
+            'completed': daily_completed.tolist(),
+        },
+        'weekly': {
+            'weeks': [date.fromordinal(first_week + 7 * i).isoformat() for i in range(n_weeks)],
+            'by_category': {int(cid): weekly[:, i].tolist() for i, cid in enumerate(category_ids)},
+            'recurring': weekly_recurring.tolist(),
+        },
+        'categories': {
+            int(cid): {
+                'tasks': int(per_category[i]),
+                'completed': int(per_category_done[i]),
+                'completion_rate': round(float(per_category_done[i] / per_category[i]), 4),
+            }
+            for i, cid in enumerate(category_ids)
+        },
+        'overdue_trend': {
+            'dates': [date.fromordinal(int(day)).isoformat() for day in trend_days],
+            'overdue': overdue_trend.tolist(),
+        },
+    }
+
+
+def get_rollups(user):
+    # Cached per user; the key includes the data version, so any task or
+    # category write makes the next request recompute.
+    today = timezone.localdate()
+    version, _ = get_data_version(user.pk)
+    key = f'tasks:analytics:{user.pk}:{version}:{today.isoformat()}'
+    rollups = cache.get(key)
+    CACHE_REQUESTS.inc(cache='analytics', result='miss' if rollups is None else 'hit')
+    if rollups is None:
+        rollups = rollup_arrays(*load_columns(user), today)
+        names = dict(Category.objects.filter(id__in=list(rollups['categories'])).values_list('id', 'name'))
+        rollups['category_names'] = {cid: names.get(cid, 'Uncategorized') for cid in rollups['categories']}
+        cache.set(key, rollups, CACHE_TIMEOUT)
+    return rollups
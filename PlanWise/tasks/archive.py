@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .deletion import delete_task_trees
+from .models import Task, ArchivedTask
+
+ARCHIVED_FIELDS = [
+    'title', 'description', 'due_date', 'category_id', 'priority', 'is_completed', 'created_at', 'updated_at',
+    'user_id', 'is_recurring', 'recurrence_frequency', 'recurrence_end_date', 'recurring_task_id',
+]
+
+
+def _subtree_ids(root_ids):
+    # Collect descendants level by level; returns (all ids, any incomplete descendant per root)
+    parents = {task_id: task_id for task_id in root_ids}  # task id -> root id
+    blocked = set()
+    level = list(root_ids)
+    while level:
+        children = list(Task.objects.filter(parent_id__in=level).values_list('id', 'parent_id', 'is_completed'))
+        level = []
+        for task_id, parent_id, is_completed in children:
+            root = parents[parent_id]
+            parents[task_id] = root
+            if not is_completed:
+                blocked.add(root)
+            level.append(task_id)
+    return parents, blocked
+
+
+def eligible_tasks(days, include_recurring=False, user=None, users=None):
+    cutoff = timezone.now() - timedelta(days=days)
+    condition = Q(is_completed=True, updated_at__lt=cutoff)
+    if include_recurring:
+        # Past occurrences of a recurring series, done or not
+        condition |= Q(is_recurring=True, due_date__lt=cutoff.date())
+    queryset = Task.objects.filter(condition, parent__isnull=True)
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    if users is not None:
+        queryset = queryset.filter(user__in=users)
+    return queryset
+
+
+def archive_batch(root_ids):
+    """
+    Move the given top-level tasks and their subtasks to ArchivedTask in one
+    transaction. Trees that still contain incomplete subtasks are left alone.
+    Returns the number of rows moved.
+    """
+    root_ids = set(root_ids)
+    with transaction.atomic():
+        parents, blocked = _subtree_ids(root_ids)
+        ids = [task_id for task_id, root in parents.items() if root not in blocked]
+        if not ids:
+            return 0
+        rows = list(Task.objects.filter(id__in=ids).values('id', 'parent_id', *ARCHIVED_FIELDS))
+        ArchivedTask.objects.bulk_create([
+            ArchivedTask(original_id=row['id'], original_parent_id=row['parent_id'],
+                         **{field: row[field] for field in ARCHIVED_FIELDS})
+            for row in rows
+        ])
+        delete_task_trees([task_id for task_id in root_ids if task_id not in blocked and task_id in parents])
+        return len(ids)
+
+
+def archive_tasks(days, batch_size=500, include_recurring=False, user=None, on_batch=None, users=None):
+    # Walks eligible roots in id order so every batch is a bounded index range
+    moved, last_id = 0, 0
+    queryset = eligible_tasks(days, include_recurring, user, users).order_by('id')
+    while True:
+        root_ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not root_ids:
+            return moved
+        last_id = root_ids[-1]
+        count = archive_batch(root_ids)
+        moved += count
+        if on_batch:
+            on_batch(count, moved)
+
+
+def search_archived(user, query=None):
+    archived = ArchivedTask.objects.filter(user=user).select_related('category')
+    if query:
+        archived = archived.filter(Q(title__icontains=query) | Q(description__icontains=query))
+    return archived
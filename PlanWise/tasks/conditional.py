@@ -0,0 +1,99 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import UserDataVersion
+
+
+def bump_data_version(user_id):
+    if user_id is None:
+        return
+    now = timezone.now()
+    if UserDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            UserDataVersion.objects.create(user_id=user_id, version=1, updated_at=now)
+    except IntegrityError:
+        # Created concurrently by another request
+        UserDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now)
+
+
+def bump_data_versions(user_ids, batch_size=500):
+    # bump_data_version for many users, two statements per batch
+    user_ids = sorted(set(user_ids) - {None})
+    now = timezone.now()
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        UserDataVersion.objects.filter(user_id__in=chunk).update(version=F('version') + 1, updated_at=now)
+        UserDataVersion.objects.bulk_create(
+            [UserDataVersion(user_id=user_id, version=1, updated_at=now) for user_id in chunk],
+            ignore_conflicts=True,
+        )
+
+
+def get_data_version(user_id):
+    row = UserDataVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def _validators(request):
+    # (etag, last_modified) for the current request, or (None, None) when the
+    # page must always be rendered.
+    if hasattr(request, '_data_validators'):
+        return request._data_validators
+    validators = (None, None)
+    if (request.method in ('GET', 'HEAD') and request.user.is_authenticated
+            and not len(get_messages(request))):
+        version, updated_at = get_data_version(request.user.pk)
+        # Pages also depend on the URL, today's date (overdue badges) and the
+        # CSRF secret embedded in their forms.
+        key = '|'.join([
+            request.get_full_path(),
+            timezone.localdate().isoformat(),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ])
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()[:16]
+        validators = (f'"{request.user.pk}-{version}-{digest}"', updated_at)
+    request._data_validators = validators
+    return validators
+
+
+def user_data_condition(view_func=None, *, variant=None):
+    """
+    Answer GETs with 304 Not Modified while the user's data version is
+    unchanged, before the view runs any queries. Views that serve several
+    representations of the same data pass variant(request), a short string
+    naming the one chosen (e.g. its content encoding), so each gets its own
+    ETag.
+    """
+    if view_func is None:
+        return lambda view_func: user_data_condition(view_func, variant=variant)
+
+    def etag(request, *args, **kwargs):
+        value = _validators(request)[0]
+        if value is not None and variant is not None:
+            value = f'{value[:-1]}-{variant(request)}"'
+        return value
+
+    conditional_view = condition(
+        etag_func=etag,
+        last_modified_func=lambda request, *args, **kwargs: _validators(request)[1],
+    )(view_func)
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if _validators(request)[0] is not None:
+            # Let the browser keep the page but revalidate on every visit
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return _wrapped_view
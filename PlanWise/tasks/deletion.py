@@ -0,0 +1,100 @@
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+
+from .models import Task, TaskReminder, TaskTombstone
+
+# Sent once per bulk delete, in place of the per-row post_delete signals the
+# DELETE statements skip. Receives task_ids_by_user, a dict of owner id ->
+# deleted task ids, and origin, the object whose deletion caused it (None
+# for task deletes). It is sent inside the delete's transaction, before
+# commit, so receivers that write to the database commit or roll back with
+# it; anything with effects outside the database belongs in
+# transaction.on_commit.
+tasks_deleted = Signal()
+
+BATCH_SIZE = 500
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _delete_in(db, model, column, values):
+    # Plain DELETE ... WHERE column IN (...): no rows loaded, no signals sent
+    quote_name = connections[db].ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connections[db].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} WHERE {quote_name(column)} IN ({placeholders})',
+            list(values),
+        )
+        return cursor.rowcount
+
+
+def _subtree_levels(root_ids, batch_size):
+    # [[roots], [children], [grandchildren], ...] as plain id lists
+    seen = set(root_ids)
+    levels = [list(seen)]
+    while levels[-1]:
+        children = []
+        for chunk in _chunks(levels[-1], batch_size):
+            for task_id in Task.objects.filter(parent_id__in=chunk).values_list('id', flat=True):
+                if task_id not in seen:
+                    seen.add(task_id)
+                    children.append(task_id)
+        levels.append(children)
+    return levels[:-1]
+
+
+def delete_task_trees(root_ids, user_id=None, batch_size=BATCH_SIZE, origin=None):
+    """
+    Delete tasks and all their subtasks with set-based DELETEs in batches,
+    without loading rows into Python the way the deletion Collector does.
+    Pass user_id when every root belongs to that user; otherwise the owner
+    of each deleted task is looked up.
+    Callers are responsible for the incomplete-subtask rule.
+    Returns the number of tasks deleted.
+    """
+    if not root_ids:
+        return 0
+    db = router.db_for_write(Task)
+    with transaction.atomic(using=db):
+        levels = _subtree_levels(root_ids, batch_size)
+        task_ids = [task_id for level in levels for task_id in level]
+        if user_id is None:
+            deleted_by_user = {}
+            for chunk in _chunks(task_ids, batch_size):
+                for task_id, owner_id in Task.objects.filter(id__in=chunk).values_list('id', 'user_id'):
+                    deleted_by_user.setdefault(owner_id, []).append(task_id)
+        else:
+            deleted_by_user = {user_id: task_ids}
+        for chunk in _chunks(task_ids, batch_size):
+            _delete_in(db, TaskReminder, 'task_id', chunk)
+        # Leaves first, so no row is ever left pointing at a deleted parent
+        for level in reversed(levels):
+            for chunk in _chunks(level, batch_size):
+                _delete_in(db, Task, 'id', chunk)
+        tasks_deleted.send(sender=Task, task_ids_by_user=deleted_by_user, origin=origin)
+    return len(task_ids)
+
+
+def delete_series(user, recurring_task_id, batch_size=BATCH_SIZE):
+    ids = list(Task.objects.filter(user=user, recurring_task_id=recurring_task_id).values_list('id', flat=True))
+    return delete_task_trees(ids, user.pk, batch_size)
+
+
+def delete_user(user, batch_size=BATCH_SIZE):
+    """
+    Delete a user, removing their task trees with set-based DELETEs first.
+    Left to the deletion Collector, every task would be loaded and get its
+    own post_delete signal, since receivers on Task rule out fast deletes.
+    No tombstones are written for a user that no longer exists, and the
+    ones already recorded are removed with them.
+    """
+    db = router.db_for_write(Task)
+    with transaction.atomic(using=db):
+        root_ids = list(Task.objects.filter(user=user, parent__isnull=True).values_list('id', flat=True))
+        delete_task_trees(root_ids, user.pk, batch_size, origin=user)
+        _delete_in(db, TaskTombstone, 'user_id', [user.pk])
+        user.delete()
@@ -5,7 +5,7 @@ class TaskForm(forms.ModelForm):
 
     class Meta:
         model = Task
-        fields = ['title', 'description', 'category', 'due_date', 'is_completed', 'is_recurring', 'recurrence_frequency', 'recurrence_end_date']
+        fields = ['title', 'description', 'category', 'priority', 'due_date', 'is_completed', 'is_recurring', 'recurrence_frequency', 'recurrence_end_date']
         widgets = {
             'due_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control', 'style': 'width: 25%'}),
             'recurrence_end_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control', 'style': 'width: 25%'}),
@@ -20,4 +20,10 @@ class TaskForm(forms.ModelForm):
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
-        fields = ['name']
\ No newline at end of file
+        fields = ['name']
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField(
+        help_text='A CSV file in the export format, or an iCalendar (.ics) file.',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ics'}),
+    )
@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+
+# Minimal streaming iCalendar (RFC 5545) support for tasks. Only the
+# properties PlanWise cares about are read: SUMMARY, DESCRIPTION,
+# DUE/DTSTART, CATEGORIES and STATUS/COMPLETED.
+
+TASK_COMPONENTS = ('VTODO', 'VEVENT')
+
+
+def _unescape(value):
+    out = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == '\\':
+            nxt = next(chars, '')
+            out.append('\n' if nxt in ('n', 'N') else nxt)
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+
+def _split_list(value):
+    # Split on commas that are not backslash-escaped
+    items, current, escaped = [], [], False
+    for ch in value:
+        if escaped:
+            current.append('\\' + ch)
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == ',':
+            items.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    items.append(''.join(current))
+    return [_unescape(item).strip() for item in items if item.strip()]
+
+
+def parse_date(value):
+    # Accepts DATE (20250101) and DATE-TIME (20250101T120000[Z]) values
+    value = value.strip()
+    if 'T' in value:
+        return datetime.strptime(value[:15], '%Y%m%dT%H%M%S').date()
+    return datetime.strptime(value[:8], '%Y%m%d').date()
+
+
+def _unfolded_lines(lines):
+    # Yields (line_number, logical_line), joining folded continuation lines
+    buffered, start = None, 0
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and buffered is not None:
+            buffered += line[1:]
+            continue
+        if buffered is not None:
+            yield start, buffered
+        buffered, start = line, number
+    if buffered is not None:
+        yield start, buffered
+
+
+def iter_ics_rows(lines):
+    """
+    Stream task rows out of an iCalendar file, one dict per VTODO/VEVENT.
+    Only the component being parsed is held in memory.
+    """
+    component, row = None, None
+    for number, line in _unfolded_lines(lines):
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        name, _, params = name.partition(';')
+        name = name.upper()
+
+        if name == 'BEGIN' and value.upper() in TASK_COMPONENTS and component is None:
+            component = value.upper()
+            row = {'line': number, 'title': '', 'description': '', 'category': '',
+                   'due_date': None, 'is_completed': False}
+        elif component is None:
+            continue
+        elif name == 'END' and value.upper() == component:
+            yield row
+            component, row = None, None
+        elif name == 'SUMMARY':
+            row['title'] = _unescape(value)
+        elif name == 'DESCRIPTION':
+            row['description'] = _unescape(value)
+        elif name == 'CATEGORIES' and not row['category']:
+            categories = _split_list(value)
+            row['category'] = categories[0] if categories else ''
+        elif name == 'DUE' or (name == 'DTSTART' and row['due_date'] is None):
+            row['due_date'] = value
+        elif name == 'STATUS':
+            row['is_completed'] = value.strip().upper() == 'COMPLETED'
+        elif name == 'COMPLETED':
+            row['is_completed'] = True
+
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    # Content lines are limited to 75 octets; continuation lines start with a space
+    if len(line.encode('utf-8')) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    for ch in line:
+        width = len(ch.encode('utf-8'))
+        if size + width > 74:
+            parts.append(current)
+            current, size = '', 0
+        current += ch
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def task_to_vtodo(task, domain='planwise'):
+    lines = [
+        'BEGIN:VTODO',
+        f'UID:task-{task.pk}@{domain}',
+        f'DTSTAMP:{_utc(task.updated_at)}',
+        f'CREATED:{_utc(task.created_at)}',
+        f'LAST-MODIFIED:{_utc(task.updated_at)}',
+        f'SUMMARY:{_escape(task.title)}',
+    ]
+    if task.description:
+        lines.append(f'DESCRIPTION:{_escape(task.description)}')
+    if task.due_date:
+        lines.append(f"DUE;VALUE=DATE:{task.due_date.strftime('%Y%m%d')}")
+    if task.category_id:
+        lines.append(f'CATEGORIES:{_escape(task.category.name)}')
+    if task.parent_id:
+        lines.append(f'RELATED-TO:task-{task.parent_id}@{domain}')
+    lines.append('STATUS:COMPLETED' if task.is_completed else 'STATUS:NEEDS-ACTION')
+    lines.append('END:VTODO')
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_calendar(tasks, name='PlanWise', domain='planwise'):
+    # Yields the calendar a component at a time, for streaming responses
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//PlanWise//{domain}//EN',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ))
+    for task in tasks:
+        yield task_to_vtodo(task, domain)
+    yield 'END:VCALENDAR\r\n'
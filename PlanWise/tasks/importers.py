@@ -0,0 +1,164 @@
+import csv
+from datetime import date
+
+from django.db import transaction
+
+from . import ical
+from .conditional import bump_data_version
+from .models import Task, Category
+
+# Columns written by the CSV export in views.export_tasks
+CSV_COLUMNS = ['Completed', 'Title', 'Description', 'Category', 'Due Date']
+COMPLETED_VALUES = {'✔', '✓', 'x', '1', 'true', 'yes', 'y', 'completed'}
+
+MAX_REPORTED_ERRORS = 100
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+CATEGORY_MAX_LENGTH = Category._meta.get_field('name').max_length
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []  # (line, message), capped at MAX_REPORTED_ERRORS
+        # (last line read, message) when the file could not be read to the
+        # end; the rows before it are still imported
+        self.stream_error = None
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def iter_csv_rows(lines):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip().lower() for column in header]
+    missing = [column for column in CSV_COLUMNS if column.lower() not in header]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    index = {column: header.index(column.lower()) for column in CSV_COLUMNS}
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        values += [''] * (len(header) - len(values))
+        yield {
+            'line': reader.line_num,
+            'title': values[index['Title']],
+            'description': values[index['Description']],
+            'category': values[index['Category']].strip(),
+            'due_date': values[index['Due Date']].strip() or None,
+            'is_completed': values[index['Completed']].strip().lower() in COMPLETED_VALUES,
+        }
+
+
+def _decoded_lines(fileobj):
+    # Decode line by line rather than through a buffered TextIOWrapper, so a
+    # bad byte fails on its own line instead of up to a buffer's worth of
+    # lines early
+    for number, raw in enumerate(fileobj):
+        yield raw.decode('utf-8-sig' if number == 0 else 'utf-8')
+
+
+def iter_rows(fileobj, file_format):
+    """
+    Wrap a binary file object (an upload or an open file) and stream rows
+    out of it as dicts without reading the whole file into memory.
+    """
+    text = _decoded_lines(fileobj)
+    if file_format == 'csv':
+        return iter_csv_rows(text), date.fromisoformat
+    if file_format == 'ics':
+        return ical.iter_ics_rows(text), ical.parse_date
+    raise ValueError(f"Unsupported import format '{file_format}'.")
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.ics') or name.endswith('.ical'):
+        return 'ics'
+    return None
+
+
+def _category_id(user, name, categories):
+    # Resolve through the per-import name -> id map, creating unknown names once
+    if not name:
+        return None
+    if name not in categories:
+        categories[name] = Category.objects.create(user=user, name=name).id
+    return categories[name]
+
+
+def import_tasks(user, rows, parse_date=date.fromisoformat, chunk_size=1000):
+    result = ImportResult()
+    categories = dict(Category.objects.filter(user=user).values_list('name', 'id'))
+    chunk = []
+
+    def flush():
+        with transaction.atomic():
+            Task.objects.bulk_create(chunk, batch_size=chunk_size)
+            # bulk_create sends no post_save signals
+            bump_data_version(user.pk)
+        result.created += len(chunk)
+        chunk.clear()
+
+    rows = iter(rows)
+    line = 0
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except (ValueError, csv.Error) as e:
+            # Undecodable bytes or broken CSV quoting: nothing after this
+            # point can be read. A file that fails before its first row is
+            # simply unreadable; otherwise keep what was read and say where
+            # it stopped.
+            if not line:
+                raise
+            result.stream_error = (line, str(e))
+            break
+        line = row['line']
+        title = row['title'].strip()
+        if not title:
+            result.add_error(line, 'Title is required.')
+            continue
+        if len(title) > TITLE_MAX_LENGTH:
+            result.add_error(line, f'Title is longer than {TITLE_MAX_LENGTH} characters.')
+            continue
+        if len(row['category']) > CATEGORY_MAX_LENGTH:
+            result.add_error(line, f'Category is longer than {CATEGORY_MAX_LENGTH} characters.')
+            continue
+        due_date = None
+        if row['due_date']:
+            try:
+                due_date = parse_date(row['due_date'])
+            except ValueError:
+                result.add_error(line, f"Invalid due date '{row['due_date']}'.")
+                continue
+
+        chunk.append(Task(
+            user=user,
+            title=title,
+            description=row['description'],
+            category_id=_category_id(user, row['category'], categories),
+            due_date=due_date,
+            is_completed=row['is_completed'],
+        ))
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    return result
+
+
+def import_file(user, fileobj, file_format, chunk_size=1000):
+    rows, parse_date = iter_rows(fileobj, file_format)
+    return import_tasks(user, rows, parse_date=parse_date, chunk_size=chunk_size)
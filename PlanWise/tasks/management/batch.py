@@ -0,0 +1,153 @@
+"""
+Fleet-wide maintenance over user shards.
+
+Users are split into id ranges of roughly --shard-size users. Each range is
+handed to a job function in a pool of worker processes; every worker opens
+its own database connections. Finished shards are recorded in a JSON
+checkpoint so an interrupted run picks up where it stopped.
+
+A job is a function registered with @batch_job(name). It receives a User
+queryset for one shard, the command options and a Counter to add its
+results to as work commits; the counters are summed across shards.
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from tasks.archive import archive_tasks
+
+JOBS = {}
+LOCK_RETRIES = 5
+
+
+def batch_job(name):
+    def register(func):
+        JOBS[name] = func
+        return func
+    return register
+
+
+def partition(shard_size):
+    # [(first_id, next_first_id), ...]; the last range is open-ended so users
+    # created during a resumed run are still covered. The database numbers
+    # the users and returns only every shard_size-th id.
+    starts = list(
+        User.objects
+        .annotate(shard_offset=(Window(RowNumber(), order_by=F('id').asc()) - 1) % shard_size)
+        .filter(shard_offset=0)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    return [(start, end) for start, end in zip(starts, starts[1:] + [None])]
+
+
+def _shard_users(start, end):
+    users = User.objects.filter(id__gte=start)
+    if end is not None:
+        users = users.filter(id__lt=end)
+    return users.order_by('id')
+
+
+def _run_shard(name, start, end, options):
+    # Jobs must be safe to re-run on a shard: one that gives up on the SQLite
+    # write lock is retried with backoff
+    began = time.perf_counter()
+    counts = Counter()
+    for attempt in range(LOCK_RETRIES + 1):
+        try:
+            JOBS[name](_shard_users(start, end), options, counts)
+            break
+        except OperationalError as e:
+            if 'locked' not in str(e) or attempt == LOCK_RETRIES:
+                raise
+            time.sleep(2 ** attempt)
+    if options.get('sleep'):
+        time.sleep(options['sleep'])
+    return start, dict(counts), time.perf_counter() - began
+
+
+def _load_checkpoint(path, name, shard_size):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('job') != name or state.get('shard_size') != shard_size:
+        raise ValueError(f'Checkpoint {path} belongs to job {state.get("job")!r} '
+                         f'with shard size {state.get("shard_size")}; remove it or pick another path.')
+    return state
+
+
+def _save_checkpoint(path, state):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def run_batch(name, workers=None, shard_size=500, checkpoint=None, options=None, on_progress=None):
+    """
+    Run job `name` over every user shard and return the summed counts.
+    on_progress(done, total, counts, elapsed) is called as shards finish.
+    """
+    options = options or {}
+    state = _load_checkpoint(checkpoint, name, shard_size)
+    if state is None:
+        state = {'job': name, 'shard_size': shard_size, 'shards': partition(shard_size), 'done': [], 'counts': {}}
+    done = set(state['done'])
+    pending = [(start, end) for start, end in state['shards'] if start not in done]
+
+    # Workers are forked; they must not share the parent's connections
+    connections.close_all()
+    started = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_shard, name, start, end, options) for start, end in pending]
+        for future in as_completed(futures):
+            start, counts, _ = future.result()
+            for key, value in counts.items():
+                state['counts'][key] = state['counts'].get(key, 0) + value
+            state['done'].append(start)
+            if checkpoint:
+                _save_checkpoint(checkpoint, state)
+            if on_progress:
+                on_progress(len(state['done']), len(state['shards']), state['counts'], time.perf_counter() - started)
+    return state['counts']
+
+
+@batch_job('report_users')
+def report_users(users, options, counts):
+    today = timezone.localdate()
+    totals = users.aggregate(
+        users=Count('id', distinct=True),
+        staff=Count('id', filter=Q(is_staff=True), distinct=True),
+        active_users=Count('id', filter=Q(last_login__date__gte=today - timedelta(days=options.get('days', 30))),
+                           distinct=True),
+    )
+    tasks = users.aggregate(
+        with_tasks=Count('task__user', distinct=True),
+        tasks=Count('task'),
+        open_tasks=Count('task', filter=Q(task__is_completed=False)),
+        overdue=Count('task', filter=Q(task__is_completed=False, task__due_date__lt=today)),
+    )
+    counts.update(totals)
+    counts.update(tasks)
+
+
+@batch_job('archive')
+def archive(users, options, counts):
+    def on_batch(count, total):
+        counts['archived'] += count
+
+    archive_tasks(options.get('days', 90), batch_size=options.get('batch_size', 500),
+                  include_recurring=options.get('include_recurring', False),
+                  users=users.values('id'), on_batch=on_batch)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archive import archive_tasks
+
+
+class Command(BaseCommand):
+    help = 'Move completed tasks older than --days (and their subtasks) to the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Archive tasks completed (last modified) more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Top-level tasks moved per transaction.')
+        parser.add_argument('--include-recurring', action='store_true',
+                            help='Also archive recurring occurrences that were due more than --days ago.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to pause between batches to let other writers in.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size >= 1.')
+
+        def on_batch(count, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Archived {count} task(s) ({total} total)")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        moved = archive_tasks(
+            options['days'],
+            batch_size=options['batch_size'],
+            include_recurring=options['include_recurring'],
+            on_batch=on_batch,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} task(s)."))
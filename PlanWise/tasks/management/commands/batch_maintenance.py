@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.management.batch import JOBS, run_batch
+
+
+class Command(BaseCommand):
+    help = 'Run a maintenance job over all users, split into id-range shards across a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job', choices=sorted(JOBS))
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes (default: one per CPU).')
+        parser.add_argument('--shard-size', type=int, default=500, help='Users per shard.')
+        parser.add_argument('--checkpoint',
+                            help='JSON file recording finished shards; an existing file resumes the run.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds each worker pauses after a shard to let other writers in.')
+        parser.add_argument('--days', type=int,
+                            help='report_users: active-user window (default 30). archive: age cutoff (default 90).')
+        parser.add_argument('--include-recurring', action='store_true',
+                            help='archive: also archive past recurring occurrences.')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['shard_size'] < 1:
+            raise CommandError('--workers and --shard-size must be >= 1.')
+
+        job_options = {'sleep': options['sleep'], 'include_recurring': options['include_recurring']}
+        if options['days'] is not None:
+            job_options['days'] = options['days']
+
+        def on_progress(done, total, counts, elapsed):
+            if options['verbosity'] > 0:
+                summary = ', '.join(f'{key} {value}' for key, value in sorted(counts.items()))
+                self.stdout.write(f'[{done}/{total} shards, {elapsed:.1f}s] {summary}')
+
+        try:
+            counts = run_batch(options['job'], workers=options['workers'], shard_size=options['shard_size'],
+                               checkpoint=options['checkpoint'], options=job_options, on_progress=on_progress)
+        except ValueError as e:
+            raise CommandError(e)
+
+        for key, value in sorted(counts.items()):
+            self.stdout.write(f'{key}: {value}')
+        if options['checkpoint'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS(f"{options['job']} finished."))
@@ -0,0 +1,73 @@
+import time
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.analytics import DAYS_AHEAD, DAYS_BACK, WEEKS_AHEAD, WEEKS_BACK, rollup_arrays
+
+
+def python_rollups(due, category, completed, recurring, today):
+    # The per-task loop the NumPy rollups replace, kept for comparison
+    today_ordinal = today.toordinal()
+    first_day = today_ordinal - DAYS_BACK
+    first_week = today_ordinal - today.weekday() - WEEKS_BACK * 7
+    n_weeks = WEEKS_BACK + WEEKS_AHEAD + 1
+    daily, daily_done, weekly, weekly_recurring = Counter(), Counter(), Counter(), Counter()
+    per_category, per_category_done = Counter(), Counter()
+    incomplete = []
+    for d, c, done, rec in zip(due, category, completed, recurring):
+        if first_day <= d <= today_ordinal + DAYS_AHEAD:
+            daily[d] += 1
+            if done:
+                daily_done[d] += 1
+        week = (d - first_week) // 7
+        if 0 <= week < n_weeks:
+            weekly[week, c] += 1
+            if rec:
+                weekly_recurring[week] += 1
+        per_category[c] += 1
+        if done:
+            per_category_done[c] += 1
+        else:
+            incomplete.append(d)
+    incomplete.sort()
+    trend = [bisect_left(incomplete, day) for day in range(today_ordinal - DAYS_BACK, today_ordinal + 1)]
+    return daily, daily_done, weekly, weekly_recurring, per_category, per_category_done, trend
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the NumPy workload rollups against a plain Python loop on synthetic tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--skip-python', action='store_true',
+                            help='Only time the NumPy rollups.')
+
+    def handle(self, *args, **options):
+        n = options['tasks']
+        today = timezone.localdate()
+        rng = np.random.default_rng(0)
+        due = today.toordinal() + rng.integers(-365, 365, size=n)
+        category = rng.integers(-1, options['categories'], size=n)
+        completed = rng.random(n) < 0.4
+        recurring = rng.random(n) < 0.2
+        self.stdout.write(f"{n} synthetic tasks, {options['categories']} categories")
+
+        best = min(self._time(rollup_arrays, due, category, completed, recurring, today)
+                   for _ in range(options['repeat']))
+        self.stdout.write(f"numpy rollups:  {best * 1000:9.1f} ms")
+
+        if not options['skip_python']:
+            lists = due.tolist(), category.tolist(), completed.tolist(), recurring.tolist()
+            python = self._time(python_rollups, *lists, today)
+            self.stdout.write(f"python loop:    {python * 1000:9.1f} ms ({python / best:.0f}x slower)")
+
+    def _time(self, func, *args):
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
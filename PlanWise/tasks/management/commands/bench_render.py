@@ -0,0 +1,240 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import Context, Engine
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tasks.models import Task, Category
+from tasks.views import _prepare_task_rows
+
+# The card and table loops of task_list.html before rows were prepared in the view
+LEGACY_TEMPLATE = """
+{% for task in tasks %}
+    <div class="col-md-6 col-lg-4 mb-4">
+        <div class="card shadow h-100 {% if task.completed %}border-success{% endif %}">
+            <div class="card-header bg-light d-flex justify-content-between align-items-center">
+                <div class="d-flex align-items-center justify-content-between w-100">
+                    <div>
+                    {% if task.is_completed %}
+                        <span class="badge bg-success"></i> Completed</span>
+                    {% else %}
+                        <span class="badge bg-warning text-dark"><i class="fas fa-hourglass-half"></i> Incomplete</span>
+                    {% endif %}
+                    </div>
+                    <div>
+                        {% if task.due_date < today and not task.is_completed %}
+                            <span class="badge bg-danger"><i class="fas fa-exclamation-triangle"></i> Overdue</span>
+                        {% endif %}
+                    </div>
+                    <div>
+                    {% if task.category %}
+                        <li class="list-group-item py-1">
+                            <span class="badge bg-secondary">
+                                <i class="fas fa-tag"></i> {{ task.category.name }}
+                            </span>
+                        </li>
+                    {% endif %}
+                    </div>
+                </div>
+                <span class="badge
+                    {% if task.priority|lower == 'high' %}bg-danger
+                    {% elif task.priority|lower == 'medium' %}bg-warning text-dark
+                    {% elif task.priority|lower == 'low' %}bg-success
+                    {% else %}bg-secondary
+                    {% endif %}
+                ">{{ task.priority|title }}</span>
+            </div>
+            <div class="card-body">
+                <h5 class="card-title mb-2">
+                    <div class="d-flex justify-content-between">
+                        <div>
+                        {{ task.title }}
+                        </div>
+                        <div>
+                        {% if task.subtasks.count > 0 %}
+                            <span class="badge bg-info">{{ task.subtasks.count }} subtask(s)</span>
+                        {% endif %}
+                        </div>
+                    </div>
+                </h5>
+                <p class="card-text mb-2">{{ task.description|truncatewords:20 }}</p>
+                {% if task.subtasks.all %}
+                    <h6 class="card-subtitle mb-2">Subtasks:</h6>
+                    <ul class="list-group list-group-flush mb-2">
+                        {% for subtask in task.subtasks.all %}
+                            <li class="list-group-item py-1">
+                                <a href="{{ subtask.get_absolute_url }}">{{ subtask.title }}</a>
+                                - {{ subtask.is_completed|yesno:"Completed,Pending" }}
+                            </li>
+                        {% endfor %}
+                    </ul>
+                {% endif %}
+                <ul class="list-group list-group-flush mb-2">
+                    <li class="list-group-item py-1">
+                        <small><i class="fas fa-calendar-alt"></i> Created: {{ task.created_at|date:"M d, Y" }}</small>
+                        <br>
+                        <small><i class="fas fa-calendar-alt"></i> Due Date: {{ task.due_date |date:"M d, Y" }}</small>
+                    </li>
+                </ul>
+            </div>
+            <div class="card-footer d-flex justify-content-between align-items-center">
+                <a href="{% url 'tasks:task_detail' task.pk %}" class="btn btn-sm btn-outline-primary">
+                    <i class="fas fa-eye"></i> View
+                </a>
+                <a href="{% url 'tasks:task_update' task.pk %}" class="btn btn-sm btn-outline-secondary">
+                    <i class="fas fa-edit"></i> Edit
+                </a>
+                <form action="{% url 'tasks:task_delete' task.pk %}" method="post" class="d-inline"
+                      onsubmit="return confirm('Are you sure you want to delete this task?');">
+                    {% csrf_token %}
+                    <button type="submit" class="btn btn-sm btn-outline-danger">
+                        <i class="fas fa-trash"></i> Delete
+                    </button>
+                </form>
+            </div>
+        </div>
+    </div>
+{% endfor %}
+{% for task in tasks %}
+<tr>
+    <td class="text-dark">{{ task.title }}</td>
+    <td class="text-dark">{{ task.description|truncatewords:20 }}</td>
+    <td class="text-dark">{{ task.category }}</td>
+    <td class="text-dark">{{ task.due_date|date:"M d, Y" }}</td>
+    <td>
+        {% if task.is_completed %}
+            <span class="badge bg-success">Completed</span>
+        {% elif task.due_date < today and not task.is_completed %}
+            <span class="badge bg-danger">Overdue</span>
+        {% else %}
+            <span class="badge bg-warning text-dark">Incomplete</span>
+        {% endif %}
+    </td>
+    <td>
+        {% if task.subtasks.count > 0 %}
+            <span class="badge bg-info">{{ task.subtasks.count }} subtasks</span>
+        {% else %}
+            <span class="text-muted">No subtasks</span>
+        {% endif %}
+    </td>
+    <td>
+        <a href="{% url 'tasks:task_detail' task.pk %}" class="btn btn-sm btn-outline-primary">View</a>
+        <a href="{% url 'tasks:task_update' task.pk %}" class="btn btn-sm btn-outline-secondary">Edit</a>
+        <form action="{% url 'tasks:task_delete' task.pk %}" method="post" class="d-inline" onsubmit="return confirm('Are you sure you want to delete this task?');">
+            {% csrf_token %}
+            <button type="submit" class="btn btn-sm btn-outline-danger">Delete</button>
+        </form>
+    </td>
+</tr>
+{% endfor %}
+"""
+
+# The same loops as task_list.html renders them now
+CURRENT_TEMPLATE = """
+{% for task in tasks %}
+    {% include 'tasks/_task_card.html' %}
+{% endfor %}
+{% for task in tasks %}
+    {% include 'tasks/_task_row.html' %}
+{% endfor %}
+"""
+
+DESCRIPTION = ' '.join(f'word{i}' for i in range(40))
+
+
+class Command(BaseCommand):
+    help = ('Measure the task list rows per 100 rows, before and after rows were prepared in the view, '
+            'end to end and template rendering alone.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--subtasks', type=int, default=2, help='Subtasks on every other task.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = self._seed(options)
+            # Without explicit loaders the engine wraps them in the cached loader
+            engine = Engine(dirs=[settings.BASE_DIR / 'Templates'], app_dirs=True)
+            today = timezone.now().date()
+            queryset = Task.objects.filter(user=user, parent__isnull=True).select_related('category')
+
+            legacy_template = engine.from_string(LEGACY_TEMPLATE)
+            current_template = engine.from_string(CURRENT_TEMPLATE)
+            prefetched = queryset.prefetch_related('subtasks')
+
+            def legacy(tasks):
+                return legacy_template.render(Context({'tasks': tasks, 'today': today, 'csrf_token': 'bench'}))
+
+            def current(tasks):
+                return current_template.render(Context({'tasks': tasks, 'csrf_token': 'bench'}))
+
+            # (label, fetch rows, render rows). "legacy" is the page as it
+            # was; "legacy, prefetched" gets the same rows as the new path, so
+            # the difference to "prepared rows" is the template work alone.
+            # .all() gives each fetch a fresh queryset, not the cached rows
+            cases = [
+                ('legacy', lambda: list(queryset.all()), legacy),
+                ('legacy, prefetched', lambda: list(prefetched.all()), legacy),
+                ('prepared rows', lambda: _prepare_task_rows(prefetched.all(), today), current),
+            ]
+            results = [(label, self._measure(fetch, render, options)) for label, fetch, render in cases]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        scale = 100 / options['rows'] * 1000
+        self.stdout.write(f"{options['rows']} rows, cached loader, median of {options['repeat']} runs, ms per 100 rows")
+        self.stdout.write(f"{'':20} {'end-to-end':>10} {'queries':>8} {'render only':>12} {'queries':>8}")
+        for label, (total, queries, render_only, render_queries) in results:
+            self.stdout.write(f'{label:20} {total * scale:10.2f} {queries:8d} {render_only * scale:12.2f} {render_queries:8d}')
+        timings = {label: result[0] for label, result in results}
+        self.stdout.write(f"speedup over legacy, same prefetched rows: "
+                          f"{timings['legacy, prefetched'] / timings['prepared rows']:.2f}x")
+        self.stdout.write(f"speedup over legacy as the page was:       "
+                          f"{timings['legacy'] / timings['prepared rows']:.2f}x")
+
+    def _seed(self, options):
+        user = User.objects.create(username='bench-render')
+        categories = Category.objects.bulk_create([Category(user=user, name=f'Category {i}') for i in range(5)])
+        today = timezone.now().date()
+        parents = Task.objects.bulk_create([
+            Task(user=user, title=f'Task {i}', description=DESCRIPTION, category=categories[i % 5],
+                 priority=('low', 'medium', 'high')[i % 3], is_completed=i % 4 == 0,
+                 due_date=today + timedelta(days=i % 10 - 5))
+            for i in range(options['rows'])
+        ])
+        Task.objects.bulk_create([
+            Task(user=user, parent=parent, title=f'Subtask {j}', is_completed=j % 2 == 0)
+            for parent in parents[::2] for j in range(options['subtasks'])
+        ])
+        return user
+
+    def _measure(self, fetch, render, options):
+        # End to end: fetch (queries + row preparation) and render. Render
+        # only: the rows are fetched once and rendered again; without a
+        # prefetch the template still queries, which the count shows.
+        render(fetch())  # warm the template cache
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            render(fetch())
+        rows = fetch()
+        with CaptureQueriesContext(connection) as render_queries:
+            render(rows)
+        totals, render_only = [], []
+        for _ in range(options['repeat']):
+            connection.queries_log.clear()
+            start = time.perf_counter()
+            render(fetch())
+            totals.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            render(rows)
+            render_only.append(time.perf_counter() - start)
+        return (statistics.median(totals), len(queries.captured_queries),
+                statistics.median(render_only), len(render_queries.captured_queries))
@@ -0,0 +1,142 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from PlanWise.replica import copy_database
+
+SCHEMA = """
+CREATE TABLE tasks_task (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    is_completed BOOLEAN NOT NULL,
+    due_date DATE,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+CREATE INDEX task_user_created ON tasks_task (user_id, created_at);
+"""
+
+# The queries TaskListView runs for one page
+LIST_QUERIES = [
+    "SELECT COUNT(*) FROM tasks_task WHERE user_id = ? AND parent_id IS NULL",
+    "SELECT COUNT(*) FROM tasks_task WHERE user_id = ? AND parent_id IS NULL AND is_completed",
+    "SELECT id, title, description, is_completed, due_date FROM tasks_task "
+    "WHERE user_id = ? AND parent_id IS NULL ORDER BY created_at DESC LIMIT 6",
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mixed read/write throughput on one SQLite file versus a primary plus backup-API replica.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=50_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--refresh-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            primary = os.path.join(tmp, 'primary.sqlite3')
+            replica = os.path.join(tmp, 'replica.sqlite3')
+            self._seed(primary, options['tasks'], options['users'])
+
+            single = self._run(primary, primary, options)
+            copy_database(primary, replica)
+            split = self._run(primary, replica, options, refresh=True)
+
+        self.stdout.write(f"{options['readers']} readers, {options['writers']} writers, {options['duration']}s each")
+        for label, result in (('single database', single), ('primary + replica', split)):
+            self.stdout.write(
+                f"{label:18} reads/s {result['reads']:8.0f}  writes/s {result['writes']:7.0f}  "
+                f"lock errors {result['errors']:5d}  refreshes {result['refreshes']}"
+            )
+        if single['reads']:
+            self.stdout.write(f"read throughput: {split['reads'] / single['reads']:.2f}x, "
+                              f"write throughput: {split['writes'] / max(single['writes'], 1):.2f}x")
+
+    def _seed(self, path, tasks, users):
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        now = '2026-01-01 00:00:00'
+        conn.executemany(
+            "INSERT INTO tasks_task (user_id, parent_id, title, description, is_completed, due_date, created_at, updated_at) "
+            "VALUES (?, NULL, ?, '', ?, NULL, ?, ?)",
+            ((i % users + 1, f'Task {i}', i % 3 == 0, now, now) for i in range(tasks)),
+        )
+        conn.commit()
+        conn.close()
+
+    def _run(self, primary, replica, options, refresh=False):
+        deadline = time.perf_counter() + options['duration']
+        counts = {'reads': 0, 'writes': 0, 'errors': 0, 'refreshes': 0}
+        lock = threading.Lock()
+        users, tasks = options['users'], options['tasks']
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            rng = random.Random()
+            while time.perf_counter() < deadline:
+                # A fresh connection per page, like Django with CONN_MAX_AGE = 0
+                conn = sqlite3.connect(replica, timeout=5)
+                try:
+                    user_id = rng.randint(1, users)
+                    for sql in LIST_QUERIES:
+                        conn.execute(sql, (user_id,)).fetchall()
+                    bump('reads')
+                except sqlite3.OperationalError:
+                    bump('errors')
+                finally:
+                    conn.close()
+
+        def writer():
+            rng = random.Random()
+            conn = sqlite3.connect(primary, timeout=5)
+            while time.perf_counter() < deadline:
+                try:
+                    with conn:
+                        conn.execute(
+                            "UPDATE tasks_task SET is_completed = NOT is_completed, updated_at = datetime('now') "
+                            "WHERE id = ?", (rng.randint(1, tasks),))
+                    bump('writes')
+                except sqlite3.OperationalError:
+                    bump('errors')
+            conn.close()
+
+        def refresher():
+            while time.perf_counter() < deadline:
+                time.sleep(options['refresh_interval'])
+                try:
+                    copy_database(primary, replica)
+                    bump('refreshes')
+                except sqlite3.OperationalError:
+                    bump('errors')
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+        if refresh:
+            threads.append(threading.Thread(target=refresher))
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'reads': counts['reads'] / elapsed,
+            'writes': counts['writes'] / elapsed,
+            'errors': counts['errors'],
+            'refreshes': counts['refreshes'],
+        }
@@ -0,0 +1,47 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.importers import detect_format, import_file
+
+
+class Command(BaseCommand):
+    help = 'Import tasks for a user from a CSV (export format) or iCalendar file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ics'], default=None,
+                            help='File format (default: detected from the extension).')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows inserted per transaction.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError('Could not detect the file format, pass --format.')
+
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_file(user, f, file_format, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except (ValueError, csv.Error) as e:
+            raise CommandError(f'Could not read file: {e}')
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more error(s)")
+        if result.stream_error:
+            line, error = result.stream_error
+            raise CommandError(f"Could not read the file past the row at line {line}: {error}. Imported {result.created} "
+                               f"task(s) up to that row, {result.error_count} row(s) skipped.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} task(s), {result.error_count} row(s) skipped."))
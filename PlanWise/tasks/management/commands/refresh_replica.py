@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PlanWise.replica import refresh_replica, replica_configured
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the read replica using the online backup API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep refreshing every N seconds instead of copying once.')
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("No 'replica' database is configured (set PLANWISE_REPLICA=1).")
+
+        while True:
+            start = time.perf_counter()
+            refresh_replica()
+            if options['verbosity'] > 1 or not options['interval']:
+                self.stdout.write(f"Replica refreshed in {(time.perf_counter() - start) * 1000:.0f} ms")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.notifications import REMINDER_BACKENDS, get_reminder_backend
+from tasks.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Send due-date reminders for incomplete tasks, sleeping until the next one is due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=sorted(REMINDER_BACKENDS), default=None,
+                            help='Delivery backend (default: settings.REMINDER_BACKEND).')
+        parser.add_argument('--file-path', default=None,
+                            help='Output directory for the file and email backends.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--lead-hours', type=int, default=settings.REMINDER_LEAD_HOURS,
+                            help='How long before the due date to send the reminder.')
+        parser.add_argument('--lookback-days', type=int, default=0,
+                            help='Also remind about tasks that came due this many days ago.')
+        parser.add_argument('--rescan-interval', type=int, default=300,
+                            help='Seconds between scans for newly created or edited tasks.')
+        parser.add_argument('--retry-delay', type=int, default=60,
+                            help='Seconds before the first retry of a failed batch; doubles on each retry.')
+        parser.add_argument('--max-retries', type=int, default=5,
+                            help='Retries of a failed reminder before leaving it to the next run.')
+        parser.add_argument('--once', action='store_true',
+                            help='Send whatever is due now and exit.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        backend_kwargs = {}
+        if options['file_path']:
+            backend_kwargs['file_path'] = options['file_path']
+        backend = get_reminder_backend(options['backend'], **backend_kwargs)
+
+        scheduler = ReminderScheduler(
+            backend,
+            batch_size=options['batch_size'],
+            lead_hours=options['lead_hours'],
+            lookback_days=options['lookback_days'],
+            rescan_interval=options['rescan_interval'],
+            retry_delay=options['retry_delay'],
+            max_retries=options['max_retries'],
+            stdout=self.stdout,
+        )
+        try:
+            scheduler.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {scheduler.sent} reminder(s), {scheduler.failed} failed."))
@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from tasks.models import Task
+from tasks.transitions import BLOCKED, CHANGED, toggle_task
+
+
+def legacy_toggle(task_id, user):
+    # The read-check-save sequence toggle_complete used before tasks.transitions
+    task = Task.objects.get(pk=task_id, user=user)
+    if not task.is_completed and task.subtasks.filter(is_completed=False).exists():
+        return BLOCKED
+    task.is_completed = not task.is_completed
+    task.save()
+    return CHANGED
+
+
+class Command(BaseCommand):
+    help = ('Toggle a small set of tasks from many threads with the legacy read-modify-save code '
+            'and with tasks.transitions, reporting throughput and lost updates. Runs on a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--tasks', type=int, default=20, help='Hot set size; fewer tasks means more contention.')
+        parser.add_argument('--subtasks', type=int, default=3)
+        parser.add_argument('--duration', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            # A file database, so threads contend on the real SQLite write lock
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'stress.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                results = [(label, self._run(toggle, options))
+                           for label, toggle in (('legacy', legacy_toggle), ('transitions', toggle_task))]
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{options['threads']} threads, {options['tasks']} tasks, {options['duration']}s each")
+        for label, result in results:
+            self.stdout.write(
+                f"{label:12} toggles/s {result['rate']:7.0f}  blocked {result['blocked']:6d}  "
+                f"lock errors {result['errors']:4d}  wrong final state {result['wrong']:3d}/{result['total']}"
+            )
+        legacy, new = results[0][1], results[1][1]
+        if legacy['rate']:
+            self.stdout.write(f"throughput: {new['rate'] / legacy['rate']:.2f}x")
+
+    def _seed(self, options):
+        Task.objects.all().delete()
+        user, _ = User.objects.get_or_create(username='stress-toggle')
+        parents = Task.objects.bulk_create(
+            [Task(user=user, title=f'Task {i}', is_completed=False) for i in range(options['tasks'])])
+        Task.objects.bulk_create([
+            Task(user=user, parent=parent, title=f'Subtask {i}', is_completed=True)
+            for parent in parents for i in range(options['subtasks'])
+        ])
+        subtasks = list(Task.objects.filter(parent__isnull=False).values_list('id', flat=True))
+        return user, [parent.pk for parent in parents], subtasks
+
+    def _run(self, toggle, options):
+        user, parent_ids, subtask_ids = self._seed(options)
+        initial = dict(Task.objects.values_list('id', 'is_completed'))
+        applied = {task_id: 0 for task_id in initial}
+        counts = {'toggles': 0, 'blocked': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                while time.perf_counter() < deadline:
+                    # Mostly parents, with subtasks flipping underneath them
+                    task_id = rng.choice(parent_ids if rng.random() < 0.7 or not subtask_ids else subtask_ids)
+                    try:
+                        outcome = toggle(task_id, user)
+                    except OperationalError:
+                        with lock:
+                            counts['errors'] += 1
+                        continue
+                    with lock:
+                        if outcome == CHANGED:
+                            counts['toggles'] += 1
+                            applied[task_id] += 1
+                        else:
+                            counts['blocked'] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        final = dict(Task.objects.values_list('id', 'is_completed'))
+        # Every reported toggle flips the flag, so the parity must match
+        wrong = sum(1 for task_id in initial
+                    if final[task_id] != (initial[task_id] != (applied[task_id] % 2 == 1)))
+        return {'rate': counts['toggles'] / elapsed, 'blocked': counts['blocked'],
+                'errors': counts['errors'], 'wrong': wrong, 'total': len(initial)}
@@ -0,0 +1,294 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms are stored as plain float samples. Without
+settings.METRICS_DIR they live in a dict in this process. With it, each
+process writes its samples to its own mmap'd file in that directory
+(metrics_<pid>.db) with no locking between processes, and the /metrics/
+endpoint sums the files of every worker.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from .models import Task, Category, ArchivedTask, TaskTombstone
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _DictStore:
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class _MmapStore:
+    # Layout: 8-byte header holding the number of used bytes, then entries of
+    # [4-byte key length][utf-8 key, padded to 8-byte alignment][8-byte double].
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        if struct.unpack_from('q', self._map, 0)[0] == 0:
+            struct.pack_into('q', self._map, 0, 8)
+        self._positions = {key: position for key, _, position in _read_entries(self._map)}
+
+    def _used(self):
+        return struct.unpack_from('q', self._map, 0)[0]
+
+    def _add_key(self, key):
+        encoded = key.encode('utf-8')
+        padding = (8 - (4 + len(encoded)) % 8) % 8
+        entry = struct.pack(f'i{len(encoded)}s{padding}xd', len(encoded), encoded, 0.0)
+        used = self._used()
+        while used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[used:used + len(entry)] = entry
+        # Publish the entry only after it is fully written
+        struct.pack_into('q', self._map, 0, used + len(entry))
+        self._positions[key] = used + len(entry) - 8
+
+    def inc(self, key, amount):
+        with self._lock:
+            if key not in self._positions:
+                self._add_key(key)
+            position = self._positions[key]
+            value = struct.unpack_from('d', self._map, position)[0]
+            struct.pack_into('d', self._map, position, value + amount)
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _read_entries(self._map)]
+
+
+def _read_entries(data):
+    used = struct.unpack_from('q', data, 0)[0]
+    position = 8
+    while position < used:
+        length = struct.unpack_from('i', data, position)[0]
+        key = bytes(data[position + 4:position + 4 + length]).decode('utf-8')
+        position += 4 + length + (8 - (4 + length) % 8) % 8
+        yield key, struct.unpack_from('d', data, position)[0], position
+        position += 8
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def _get_store():
+    global _store, _store_pid
+    # Re-open after a fork so children never share the parent's file
+    if _store is None or _store_pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store_pid != os.getpid():
+                directory = getattr(settings, 'METRICS_DIR', None)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    _store = _MmapStore(os.path.join(directory, f'metrics_{os.getpid()}.db'))
+                else:
+                    _store = _DictStore()
+                _store_pid = os.getpid()
+    return _store
+
+
+def _collect_samples():
+    # Sum the samples of every process sharing the metrics directory
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return _get_store().items()
+    totals = {}
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for key, value, _ in _read_entries(data):
+                    totals[key] = totals.get(key, 0.0) + value
+    return totals.items()
+
+
+def _key(name, labels):
+    return json.dumps([name, labels], sort_keys=True, separators=(',', ':'))
+
+
+_registry = {}
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[name] = self
+
+    def inc(self, amount=1, **labels):
+        _get_store().inc(_key(self.name + '_total', labels), amount)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        _registry[name] = self
+
+    def observe(self, value, **labels):
+        store = _get_store()
+        # Every bucket is touched, even with 0, so the full set of series
+        # exists from the first observation of a label set
+        for bound in self.buckets:
+            store.inc(_key(self.name + '_bucket', dict(labels, le=str(bound))), 1 if value <= bound else 0)
+        store.inc(_key(self.name + '_bucket', dict(labels, le='+Inf')), 1)
+        store.inc(_key(self.name + '_count', labels), 1)
+        store.inc(_key(self.name + '_sum', labels), value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Gauge:
+    # Computed when scraped: `collect` returns [(labels, value), ...]
+    type = 'gauge'
+
+    def __init__(self, name, documentation, collect):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        _registry[name] = self
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in sorted(labels.items())) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_metrics():
+    samples = {}
+    for key, value in _collect_samples():
+        name, labels = json.loads(key)
+        samples.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        if metric.type == 'gauge':
+            rows = [(name, labels, value) for labels, value in metric.collect()]
+        elif metric.type == 'counter':
+            rows = [(name + '_total', labels, value) for labels, value in samples.get(name + '_total', [])]
+        else:
+            rows = [(name + suffix, labels, value)
+                    for suffix in ('_bucket', '_count', '_sum')
+                    for labels, value in samples.get(name + suffix, [])]
+        for sample_name, labels, value in rows:
+            lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+VIEW_LATENCY = Histogram('planwise_view_latency_seconds', 'Time spent handling a request, by URL name.',
+                         ['view', 'method', 'status'])
+EXPORT_DURATION = Histogram('planwise_export_duration_seconds', 'Time to build a task export.', ['format'])
+RECURRING_DURATION = Histogram('planwise_recurring_create_seconds', 'Time to create the occurrences of a recurring task.')
+RECURRING_CREATED = Counter('planwise_recurring_occurrences_created', 'Occurrences created for recurring tasks.')
+DB_WRITE_DURATION = Histogram('planwise_db_write_seconds',
+                              'Duration of INSERT/UPDATE/DELETE statements, including time blocked on the SQLite write lock.',
+                              ['database'])
+DB_LOCKED = Counter('planwise_db_locked', 'Statements that gave up with "database is locked".', ['database'])
+CACHE_REQUESTS = Counter('planwise_cache_requests', 'Cache lookups by cache and result (hit/miss).', ['cache', 'result'])
+
+
+def _table_rows():
+    return [({'table': model._meta.db_table}, model.objects.count())
+            for model in (Task, Category, ArchivedTask, TaskTombstone)]
+
+
+def _recurring_series():
+    series = (Task.objects.filter(is_recurring=True, recurring_task_id__isnull=False)
+              .values('recurring_task_id').distinct().count())
+    return [({}, series)]
+
+
+Gauge('planwise_table_rows', 'Rows per table, counted when scraped.', _table_rows)
+Gauge('planwise_recurring_series', 'Distinct recurring task series, counted when scraped.', _recurring_series)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _write_timer(alias):
+    def wrapper(execute, sql, params, many, context):
+        if not sql.lstrip()[:6].upper().startswith(WRITE_STATEMENTS):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if 'locked' in str(e):
+                DB_LOCKED.inc(database=alias)
+            raise
+        finally:
+            DB_WRITE_DURATION.observe(time.perf_counter() - start, database=alias)
+    return wrapper
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_write_timer(alias)))
+            response = self.get_response(request)
+        match = request.resolver_match
+        VIEW_LATENCY.observe(time.perf_counter() - start,
+                             view=match.view_name if match else 'unresolved',
+                             method=request.method, status=str(response.status_code))
+        return response
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
+import secrets
 import uuid
 
 # Create your models here.
@@ -26,6 +28,7 @@ class Task(models.Model):
     description = models.TextField(blank=True)
     due_date = models.DateField(null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, null=True, blank=True)
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -39,9 +42,114 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Range scans over upcoming due dates (reminder scheduler)
+            models.Index(fields=['due_date', 'id'], name='task_due_date_idx'),
+            # Change feed: per-user scans ordered by last modification
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+            # Urgency ranking: a user's open top-level tasks by due date
+            models.Index(fields=['user', 'due_date'], name='task_user_open_due_idx',
+                         condition=models.Q(is_completed=False, parent__isnull=True)),
+        ]
     
     def __str__(self):
         return self.title
     
     def get_absolute_url(self):
-        return reverse('tasks:task_detail', kwargs={'pk': self.pk})
\ No newline at end of file
+        return reverse('tasks:task_detail', kwargs={'pk': self.pk})
+
+
+class TaskReminder(models.Model):
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminders')
+    # The due date the reminder was sent for, so moving a task re-arms it
+    due_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    backend = models.CharField(max_length=50)
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'due_date'], name='unique_task_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.due_date}): {self.status}"
+
+
+class TaskTombstone(models.Model):
+    # Records deleted tasks so sync clients can be told about them. No FK
+    # constraint on the user: tombstones are written while a user's tasks are
+    # being cascade-deleted along with the user.
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='tombstone_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted at {self.deleted_at}"
+
+
+class ArchivedTask(models.Model):
+    # Cold storage for old completed tasks, moved out of the Task table by the
+    # archive_tasks command. Ids of the original rows are kept for reference.
+    original_id = models.BigIntegerField(unique=True)
+    original_parent_id = models.BigIntegerField(null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    is_completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_recurring = models.BooleanField(default=False)
+    recurrence_frequency = models.CharField(max_length=10, blank=True, null=True)
+    recurrence_end_date = models.DateField(blank=True, null=True)
+    recurring_task_id = models.UUIDField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='archived_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class UserDataVersion(models.Model):
+    # Bumped on every write to a user's tasks or categories; used as the
+    # validator for conditional GETs on the task pages.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+
+def new_feed_key():
+    return secrets.token_urlsafe(16)
+
+
+class CalendarFeed(models.Model):
+    # Secret part of a user's calendar subscription URL; replacing the key
+    # revokes every URL handed out before.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar_feed')
+    key = models.CharField(max_length=32, default=new_feed_key)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Calendar feed of {self.user}"
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+
+# Reminder delivery backends. Each backend gets a list of tasks (with `user`
+# loaded) and delivers them in one go; raising marks the whole batch failed.
+
+def _reminder_line(task):
+    return f"[{task.user.username}] '{task.title}' is due {task.due_date:%b %d, %Y}"
+
+
+class ConsoleBackend:
+    name = 'console'
+
+    def __init__(self, stream=None, **kwargs):
+        self.stream = stream or sys.stdout
+
+    def send_batch(self, tasks):
+        for task in tasks:
+            self.stream.write(_reminder_line(task) + '\n')
+        self.stream.flush()
+
+
+class FileBackend:
+    name = 'file'
+
+    def __init__(self, file_path=None, **kwargs):
+        self.path = Path(file_path or settings.REMINDER_FILE_PATH) / 'reminders.log'
+
+    def send_batch(self, tasks):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stamp = timezone.now().isoformat()
+        with self.path.open('a', encoding='utf-8') as f:
+            for task in tasks:
+                f.write(f"{stamp} {_reminder_line(task)}\n")
+
+
+class EmailFileBackend:
+    # Writes real email messages through Django's file-based mail backend,
+    # so nothing leaves the machine.
+    name = 'email'
+
+    def __init__(self, file_path=None, **kwargs):
+        self.file_path = str(file_path or settings.REMINDER_FILE_PATH)
+
+    def send_batch(self, tasks):
+        messages = []
+        for task in tasks:
+            if not task.user.email:
+                continue
+            messages.append(EmailMessage(
+                subject=f"Reminder: {task.title}",
+                body=_reminder_line(task),
+                to=[task.user.email],
+            ))
+        connection = get_connection('django.core.mail.backends.filebased.EmailBackend', file_path=self.file_path)
+        connection.send_messages(messages)
+
+
+REMINDER_BACKENDS = {
+    backend.name: backend for backend in (ConsoleBackend, FileBackend, EmailFileBackend)
+}
+
+
+def get_reminder_backend(name=None, **kwargs):
+    name = name or settings.REMINDER_BACKEND
+    try:
+        return REMINDER_BACKENDS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown reminder backend '{name}'. Choose from: {', '.join(REMINDER_BACKENDS)}")
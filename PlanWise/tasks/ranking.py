@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Least
+
+from .models import Task
+
+PRIORITY_WEIGHTS = {'high': 30, 'medium': 15, 'low': 0}
+
+# (days until due, weight); overdue tasks score highest
+DUE_WEIGHTS = [(1, 70), (3, 50), (7, 30)]
+OVERDUE_WEIGHT = 100
+DUE_TODAY_WEIGHT = 80
+DUE_LATER_WEIGHT = 10
+SUBTASK_WEIGHT = 2
+MAX_COUNTED_SUBTASKS = 5
+
+
+def with_urgency(queryset, today):
+    """
+    Annotate `urgency`, computed entirely in SQL: priority weight + a weight
+    for how soon the task is due + a little for each open subtask.
+    """
+    open_subtasks = (
+        Task.objects.filter(parent=OuterRef('pk'), is_completed=False)
+        .order_by().values('parent').annotate(count=Count('pk')).values('count')
+    )
+    due_weight = Case(
+        When(due_date__isnull=True, then=Value(0)),
+        When(due_date__lt=today, then=Value(OVERDUE_WEIGHT)),
+        When(due_date=today, then=Value(DUE_TODAY_WEIGHT)),
+        *[When(due_date__lte=today + timedelta(days=days), then=Value(weight)) for days, weight in DUE_WEIGHTS],
+        default=Value(DUE_LATER_WEIGHT),
+        output_field=IntegerField(),
+    )
+    priority_weight = Case(
+        *[When(priority=priority, then=Value(weight)) for priority, weight in PRIORITY_WEIGHTS.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return queryset.alias(
+        open_subtasks=Coalesce(Subquery(open_subtasks, output_field=IntegerField()), 0),
+    ).annotate(
+        urgency=priority_weight + due_weight
+        + Least(F('open_subtasks'), Value(MAX_COUNTED_SUBTASKS)) * Value(SUBTASK_WEIGHT),
+    )
+
+
+def top_tasks(user, today, limit=20):
+    # The database ranks and applies LIMIT, so only `limit` rows come back
+    queryset = Task.objects.filter(user=user, is_completed=False, parent__isnull=True).select_related('category')
+    ordering = ['-urgency', F('due_date').asc(nulls_last=True), 'id']
+
+    # Tasks due after the last weighted window (or never) can score at most
+    # `ceiling`. If the top `limit` tasks due within the window all reach it,
+    # nothing outside can outrank them, so only that index range is ranked.
+    horizon = today + timedelta(days=DUE_WEIGHTS[-1][0])
+    ceiling = DUE_LATER_WEIGHT + max(PRIORITY_WEIGHTS.values()) + MAX_COUNTED_SUBTASKS * SUBTASK_WEIGHT
+    tasks = list(with_urgency(queryset.filter(due_date__lte=horizon), today).order_by(*ordering)[:limit])
+    if len(tasks) < limit or tasks[-1].urgency < ceiling:
+        tasks = list(with_urgency(queryset, today).order_by(*ordering)[:limit])
+
+    # Subtask counts for display, for the returned rows only
+    counts = dict(
+        Task.objects.filter(parent__in=tasks, is_completed=False).order_by()
+        .values('parent').annotate(count=Count('pk')).values_list('parent', 'count')
+    )
+    for task in tasks:
+        task.open_subtasks = counts.get(task.pk, 0)
+    return tasks
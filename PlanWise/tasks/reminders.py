@@ -0,0 +1,173 @@
+import heapq
+import time as _time
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Task, TaskReminder
+from .sync import OVERLAP
+
+
+class ReminderScheduler:
+    """
+    Keeps a min-heap of upcoming reminders, filled a page at a time from an
+    index-ordered (due_date, id) range scan, so only a bounded window of tasks
+    is ever held in memory no matter how large the table is.
+
+    Reminders in a batch the backend fails to send are pushed back onto the
+    heap and retried after retry_delay, doubling up to MAX_RETRY_DELAY, at
+    most max_retries times.
+    """
+    MAX_RETRY_DELAY = timedelta(hours=1)
+
+    def __init__(self, backend, batch_size=500, lead_hours=24, lookback_days=0,
+                 rescan_interval=300, retry_delay=60, max_retries=5, stdout=None, sleep=_time.sleep):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.lead = timedelta(hours=lead_hours)
+        self.rescan_interval = timedelta(seconds=rescan_interval)
+        self.retry_delay = timedelta(seconds=retry_delay)
+        self.max_retries = max_retries
+        self.stdout = stdout
+        self.sleep = sleep
+
+        self.heap = []
+        self.queued = set()
+        self.attempts = {}  # (task_id, due_date) -> failed sends so far
+        self.start_date = timezone.localdate() - timedelta(days=lookback_days)
+        self.cursor = None  # (due_date, id) of the last task loaded
+        self.exhausted = False
+        self.last_rescan = timezone.now()
+        self.sent = 0
+        self.failed = 0
+
+    def remind_at(self, due_date):
+        return timezone.make_aware(datetime.combine(due_date, time.min)) - self.lead
+
+    def _pending(self):
+        sent = TaskReminder.objects.filter(task=OuterRef('pk'), due_date=OuterRef('due_date'), status='sent')
+        return (Task.objects
+                .filter(is_completed=False, due_date__gte=self.start_date)
+                .exclude(Exists(sent)))
+
+    def _push(self, rows):
+        for task_id, due_date in rows:
+            if (task_id, due_date) in self.queued:
+                continue
+            self.queued.add((task_id, due_date))
+            heapq.heappush(self.heap, (self.remind_at(due_date), task_id, due_date))
+
+    def _fill(self):
+        # Load the next page only when the heap runs low
+        if self.exhausted or len(self.heap) >= self.batch_size:
+            return
+        queryset = self._pending()
+        if self.cursor:
+            due_date, task_id = self.cursor
+            queryset = queryset.filter(Q(due_date__gt=due_date) | Q(due_date=due_date, id__gt=task_id))
+        rows = list(queryset.order_by('due_date', 'id').values_list('id', 'due_date')[:self.batch_size])
+        if rows:
+            self.cursor = (rows[-1][1], rows[-1][0])
+            self._push(rows)
+        self.exhausted = len(rows) < self.batch_size
+
+    def _rescan(self):
+        # Pick up tasks created or moved behind the cursor since the last scan.
+        # The due_date range keeps this bounded to the already-loaded window.
+        # Writes stamped just before the last scan may have committed after
+        # it, so the scan reaches back OVERLAP; queued and _deliver drop
+        # anything seen twice.
+        now = timezone.now()
+        if self.cursor:
+            rows = (self._pending()
+                    .filter(updated_at__gte=self.last_rescan - OVERLAP,
+                            due_date__gte=timezone.localdate(),
+                            due_date__lte=self.cursor[0])
+                    .values_list('id', 'due_date'))
+            self._push(rows.iterator())
+        self.last_rescan = now
+        # New tasks may have been added past the end of the scan
+        self.exhausted = False
+
+    def _deliver(self, entries):
+        ids = [task_id for _, task_id, _ in entries]
+        for _, task_id, due_date in entries:
+            self.queued.discard((task_id, due_date))
+
+        # Re-check against the database: the task may have been completed,
+        # moved or reminded by another worker since it was loaded.
+        wanted = {(task_id, due_date) for _, task_id, due_date in entries}
+        tasks = [
+            task for task in self._pending().filter(id__in=ids).select_related('user')
+            if (task.id, task.due_date) in wanted
+        ]
+        for key in wanted - {(task.id, task.due_date) for task in tasks}:
+            self.attempts.pop(key, None)
+        if not tasks:
+            return
+
+        status, error = 'sent', ''
+        try:
+            self.backend.send_batch(tasks)
+        except Exception as exc:
+            status, error = 'failed', str(exc)
+
+        now = timezone.now()
+        TaskReminder.objects.bulk_create(
+            [TaskReminder(task=task, due_date=task.due_date, status=status, backend=self.backend.name,
+                          error=error, sent_at=now) for task in tasks],
+            update_conflicts=True,
+            unique_fields=['task', 'due_date'],
+            update_fields=['status', 'backend', 'error', 'sent_at'],
+        )
+        if status == 'sent':
+            self.sent += len(tasks)
+            for task in tasks:
+                self.attempts.pop((task.id, task.due_date), None)
+        else:
+            self.failed += len(tasks)
+            self._retry_later(tasks, now)
+        if self.stdout:
+            self.stdout.write(f"{status} {len(tasks)} reminder(s) via {self.backend.name}")
+
+    def _retry_later(self, tasks, now):
+        # The keyset cursor has moved past these and a rescan only finds
+        # edited tasks, so they go back on the heap here
+        for task in tasks:
+            key = (task.id, task.due_date)
+            attempts = self.attempts.get(key, 0) + 1
+            if attempts > self.max_retries:
+                self.attempts.pop(key, None)
+                continue
+            self.attempts[key] = attempts
+            delay = min(self.retry_delay * 2 ** (attempts - 1), self.MAX_RETRY_DELAY)
+            self.queued.add(key)
+            heapq.heappush(self.heap, (now + delay, task.id, task.due_date))
+
+    def dispatch_due(self):
+        now = timezone.now()
+        while True:
+            self._fill()
+            batch = []
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self.heap))
+            if not batch:
+                return
+            self._deliver(batch)
+
+    def run(self, once=False, max_sleep=300):
+        while True:
+            self.dispatch_due()
+            if once:
+                return
+            now = timezone.now()
+            if now - self.last_rescan >= self.rescan_interval:
+                self._rescan()
+                continue
+            # Sleep until the next reminder is due, waking up for rescans
+            wait = min(max_sleep, (self.last_rescan + self.rescan_interval - now).total_seconds())
+            if self.heap:
+                wait = min(wait, (self.heap[0][0] - now).total_seconds())
+            if wait > 0:
+                self.sleep(wait)
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .conditional import bump_data_version, bump_data_versions
+from .deletion import tasks_deleted
+from .models import Task, Category, TaskTombstone
+
+
+def _deleting_user(origin):
+    # origin is the instance or queryset whose delete() started the cascade
+    return isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User)
+
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    # No sync client is left to tell when the owner is being deleted
+    if _deleting_user(origin):
+        return
+    TaskTombstone.objects.create(user_id=instance.user_id, task_id=instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_user_data_version(sender, instance, origin=None, **kwargs):
+    # Nothing to invalidate when the user itself is being deleted
+    if _deleting_user(origin):
+        return
+    bump_data_version(instance.user_id)
+
+
+@receiver(tasks_deleted, sender=Task)
+def record_bulk_delete(sender, task_ids_by_user, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    TaskTombstone.objects.bulk_create(
+        [TaskTombstone(user_id=user_id, task_id=task_id)
+         for user_id, task_ids in task_ids_by_user.items() for task_id in task_ids],
+        batch_size=500,
+    )
+    bump_data_versions(task_ids_by_user)
@@ -0,0 +1,102 @@
+"""
+Compact per-user task snapshot for filtering on the client.
+
+The payload is columnar: parallel arrays with one entry per task, in task
+list order (newest first).
+
+    ids, titles, descriptions, parent_ids, category_ids
+    due       days since 1970-01-01, or null
+    created   seconds since 1970-01-01 UTC
+    flags     bit 0 completed, bit 1 recurring, bits 2-3 priority
+              (0 low, 1 medium, 2 high)
+    categories  {id: name}
+
+It is cached gzip-compressed per user. When the user's data version moves,
+only tasks modified since the last build and new tombstones are read and
+applied, the same way the sync feed pages through changes.
+"""
+import gzip
+import json
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .conditional import get_data_version
+from .metrics import CACHE_REQUESTS
+from .models import Task, Category, TaskTombstone
+from .sync import OVERLAP, _micros
+
+SNAPSHOT_FIELDS = ('id', 'title', 'description', 'parent_id', 'category_id', 'due_date',
+                   'created_at', 'updated_at', 'is_completed', 'is_recurring', 'priority')
+PRIORITY_BITS = {'low': 0, 'medium': 1, 'high': 2}
+EPOCH_DATE = date(1970, 1, 1)
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _row(values):
+    (task_id, title, description, parent_id, category_id, due_date,
+     created_at, updated_at, is_completed, is_recurring, priority) = values
+    flags = int(is_completed) | int(is_recurring) << 1 | PRIORITY_BITS.get(priority, 1) << 2
+    due = (due_date - EPOCH_DATE).days if due_date else None
+    return (task_id, title, description, parent_id, category_id, due, _micros(created_at) // 1_000_000, flags)
+
+
+def _apply_changes(user_id, state):
+    tombstones = TaskTombstone.objects.filter(user_id=user_id, id__gt=state['tombstone_id'])
+    tasks = Task.objects.filter(user_id=user_id)
+    if state['cursor'] is None:
+        # Full build: deletes before now are already absent from the tasks
+        state['tombstone_id'] = tombstones.aggregate(last=Max('id'))['last'] or state['tombstone_id']
+    else:
+        for tombstone_id, task_id in tombstones.order_by('id').values_list('id', 'task_id'):
+            state['rows'].pop(task_id, None)
+            state['tombstone_id'] = tombstone_id
+        tasks = tasks.filter(updated_at__gte=state['cursor'] - OVERLAP)
+
+    for values in tasks.values_list(*SNAPSHOT_FIELDS).iterator(chunk_size=2000):
+        state['rows'][values[0]] = _row(values)
+        if state['cursor'] is None or values[7] > state['cursor']:
+            state['cursor'] = values[7]
+
+
+def _encode(rows, categories, version):
+    ordered = sorted(rows.values(), key=lambda row: (row[6], row[0]), reverse=True)
+    ids, titles, descriptions, parent_ids, category_ids, due, created, flags = (
+        [list(column) for column in zip(*ordered)] if ordered else [[] for _ in range(8)])
+    payload = {
+        'version': version,
+        'categories': categories,
+        'ids': ids,
+        'titles': titles,
+        'descriptions': descriptions,
+        'parent_ids': parent_ids,
+        'category_ids': category_ids,
+        'due': due,
+        'created': created,
+        'flags': flags,
+    }
+    return gzip.compress(json.dumps(payload, separators=(',', ':')).encode(), compresslevel=6)
+
+
+def get_snapshot(user):
+    # Returns the gzip-compressed JSON payload
+    version, _ = get_data_version(user.pk)
+    key = f'tasks:snapshot:{user.pk}'
+    state = cache.get(key)
+    if state is not None and state['version'] == version:
+        CACHE_REQUESTS.inc(cache='snapshot', result='hit')
+        return state['body']
+
+    CACHE_REQUESTS.inc(cache='snapshot', result='miss' if state is None else 'refresh')
+    if state is None:
+        state = {'rows': {}, 'cursor': None, 'tombstone_id': 0}
+    # The version is read before the changes, so a write racing with this
+    # build moves it again and the next request picks the write up.
+    _apply_changes(user.pk, state)
+    categories = dict(
+        Category.objects.filter(Q(user=user) | Q(task__user=user)).distinct().values_list('id', 'name'))
+    state['version'] = version
+    state['body'] = _encode(state['rows'], categories, version)
+    cache.set(key, state, CACHE_TIMEOUT)
+    return state['body']
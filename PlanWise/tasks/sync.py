@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core import signing
+from django.db.models import Max, Q
+from django.utils import timezone as django_timezone
+
+from .conditional import bump_data_version, get_data_version
+from .models import Task, TaskTombstone, CalendarFeed, new_feed_key
+
+SYNC_TOKEN_SALT = 'tasks.sync'
+FEED_TOKEN_SALT = 'tasks.calendar-feed'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Task.save() stamps updated_at before it waits for the SQLite write lock, so
+# a row can commit after a later-stamped one a reader has already seen.
+# Readers paging on updated_at re-read this much before their cursor.
+OVERLAP = timedelta(seconds=5)
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+def _micros(value):
+    if value is None:
+        return 0
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def make_sync_token(user, updated_at_us, task_id, tombstone_id):
+    return signing.dumps([user.pk, updated_at_us, task_id, tombstone_id], salt=SYNC_TOKEN_SALT, compress=True)
+
+
+def read_sync_token(user, token):
+    try:
+        user_id, updated_at_us, task_id, tombstone_id = signing.loads(token, salt=SYNC_TOKEN_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        raise InvalidSyncToken('Invalid sync token.')
+    if user_id != user.pk:
+        raise InvalidSyncToken('Sync token belongs to another user.')
+    return updated_at_us, task_id, tombstone_id
+
+
+def serialize_task(task):
+    return {
+        'id': task.pk,
+        'title': task.title,
+        'description': task.description,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'category_id': task.category_id,
+        'priority': task.priority,
+        'is_completed': task.is_completed,
+        'parent_id': task.parent_id,
+        'is_recurring': task.is_recurring,
+        'recurring_task_id': str(task.recurring_task_id),
+        'updated_at': task.updated_at.isoformat(),
+    }
+
+
+def changes_since(user, token=None, limit=500):
+    """
+    Return tasks created/updated and ids deleted since `token`, ordered by
+    (updated_at, id). Without a token the whole task set is returned (paged),
+    starting from the current end of the tombstone log.
+
+    Rows stamped within OVERLAP before the token's position are sent again
+    along with the next page, so a write that committed after the token was
+    issued is still delivered. Clients apply changes by id, so a repeated
+    row is harmless. has_more only follows the rows past the token.
+    """
+    if token:
+        updated_at_us, last_id, tombstone_id = read_sync_token(user, token)
+        updated_at = EPOCH + timedelta(microseconds=updated_at_us)
+    else:
+        updated_at_us, last_id, updated_at = 0, 0, None
+        tombstone_id = TaskTombstone.objects.filter(user=user).aggregate(last=Max('id'))['last'] or 0
+
+    tasks = Task.objects.filter(user=user)
+    overlap = []
+    if updated_at is not None:
+        after_token = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=last_id)
+        overlap = list(tasks.filter(updated_at__gte=updated_at - OVERLAP).exclude(after_token)
+                       .order_by('updated_at', 'id')[:limit])
+        tasks = tasks.filter(after_token)
+    tasks = list(tasks.order_by('updated_at', 'id')[:limit + 1])
+
+    tombstones = list(
+        TaskTombstone.objects.filter(user=user, id__gt=tombstone_id)
+        .order_by('id').values_list('id', 'task_id')[:limit + 1]
+    )
+
+    has_more = len(tasks) > limit or len(tombstones) > limit
+    tasks, tombstones = tasks[:limit], tombstones[:limit]
+    if tasks:
+        updated_at_us, last_id = _micros(tasks[-1].updated_at), tasks[-1].pk
+    if tombstones:
+        tombstone_id = tombstones[-1][0]
+
+    return {
+        'changes': [serialize_task(task) for task in overlap + tasks],
+        'deleted': [task_id for _, task_id in tombstones],
+        'next_token': make_sync_token(user, updated_at_us, last_id, tombstone_id),
+        'has_more': has_more,
+    }
+
+
+def make_feed_token(user):
+    feed, _ = CalendarFeed.objects.get_or_create(user=user)
+    return signing.dumps([user.pk, feed.key], salt=FEED_TOKEN_SALT)
+
+
+def rotate_feed_token(user):
+    # Revokes the current subscription URL; the version bump makes the
+    # calendar page show the new one
+    CalendarFeed.objects.update_or_create(
+        user=user, defaults={'key': new_feed_key(), 'created_at': django_timezone.now()})
+    bump_data_version(user.pk)
+
+
+def read_feed_token(token):
+    try:
+        user_id, key = signing.loads(token, salt=FEED_TOKEN_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    if not CalendarFeed.objects.filter(user_id=user_id, key=key).exists():
+        return None
+    return user_id
+
+
+def feed_state(user_id):
+    # Everything a subscription depends on: the newest task write, the
+    # newest delete and the data version, which also moves when a category
+    # is renamed. All are cheap index-backed lookups.
+    last_update = Task.objects.filter(user_id=user_id).aggregate(last=Max('updated_at'))['last']
+    last_delete = TaskTombstone.objects.filter(user_id=user_id).aggregate(id=Max('id'), at=Max('deleted_at'))
+    version, version_updated_at = get_data_version(user_id)
+    last_modified = max(filter(None, [last_update, last_delete['at'], version_updated_at]), default=None)
+    etag = f"{_micros(last_update)}-{last_delete['id'] or 0}-{version}"
+    return etag, last_modified
@@ -0,0 +1,86 @@
+"""
+Task state transitions as single conditional statements.
+
+Each transition checks its precondition in the WHERE clause of the UPDATE or
+DELETE that applies it, so there is no window between the check and the
+write for a concurrent toggle or subtask edit to slip into. Only the
+columns that change (is_completed, updated_at) are written.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from .conditional import bump_data_version
+from .deletion import delete_task_trees
+from .models import Task
+
+CHANGED = 'changed'
+BLOCKED = 'blocked'  # the task still has incomplete subtasks
+NOT_FOUND = 'not_found'
+
+
+def _has_open_subtasks():
+    return Exists(Task.objects.filter(parent_id=OuterRef('pk'), is_completed=False))
+
+
+def _failure(task_id, user):
+    # Only a failed transition costs a second query, to tell why it failed
+    if Task.objects.filter(pk=task_id, user=user).exists():
+        return BLOCKED
+    return NOT_FOUND
+
+
+def _update(queryset, task_id, user, **values):
+    # The version bump shares the UPDATE's transaction: one commit per transition
+    with transaction.atomic(using=router.db_for_write(Task)):
+        updated = queryset.update(updated_at=timezone.now(), **values)
+        if updated:
+            bump_data_version(user.pk)
+    return CHANGED if updated else _failure(task_id, user)
+
+
+def complete_task(task_id, user):
+    queryset = Task.objects.filter(pk=task_id, user=user).filter(Q(is_completed=True) | ~_has_open_subtasks())
+    return _update(queryset, task_id, user, is_completed=True)
+
+
+def reopen_task(task_id, user):
+    return _update(Task.objects.filter(pk=task_id, user=user), task_id, user, is_completed=False)
+
+
+def toggle_task(task_id, user):
+    # Reopening is always allowed; completing requires no incomplete subtasks
+    queryset = Task.objects.filter(pk=task_id, user=user).filter(Q(is_completed=True) | ~_has_open_subtasks())
+    return _update(queryset, task_id, user,
+                   is_completed=Case(When(is_completed=True, then=Value(False)), default=Value(True)))
+
+
+def _delete_unless_open_subtasks(db, task_id, user):
+    # QuerySet.delete() would load the row and run the Collector; this is
+    # one statement whose WHERE clause carries the precondition
+    quote_name = connections[db].ops.quote_name
+    table = quote_name(Task._meta.db_table)
+    with connections[db].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id = %s AND user_id = %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {table} AS subtask WHERE subtask.parent_id = {table}.id AND subtask.is_completed = %s)',
+            [task_id, user.pk, False],
+        )
+        return cursor.rowcount
+
+
+def delete_task(task_id, user):
+    """
+    Delete a task and its subtree unless it has incomplete subtasks. The
+    conditional DELETE of the root runs first and takes the write lock; the
+    subtree follows in the same transaction, which is fine because foreign
+    keys are only checked at commit.
+    """
+    db = router.db_for_write(Task)
+    with transaction.atomic(using=db):
+        deleted = _delete_unless_open_subtasks(db, task_id, user)
+        if not deleted:
+            return _failure(task_id, user)
+        # Sends tasks_deleted, which records tombstones and bumps the version
+        delete_task_trees([task_id], user.pk)
+    return CHANGED
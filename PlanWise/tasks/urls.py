@@ -5,6 +5,7 @@ app_name = 'tasks'
 
 urlpatterns = [
     path('', views.TaskListView.as_view(), name='task_list'),
+    path('today/', views.TodayView.as_view(), name='today'),
     path('task/<int:pk>/', views.TaskDetailView.as_view(), name='task_detail'),
     path('task/new/', views.TaskCreateView.as_view(), name='task_create'),
     path('task/<int:pk>/edit/', views.TaskUpdateView.as_view(), name='task_update'),
@@ -14,7 +15,16 @@ urlpatterns = [
     path('categories/', views.CategoryListView.as_view(), name='category_list'),
     path('categories/<int:pk>/update/', views.CategoryUpdateView.as_view(), name='category_update'),
     path('categories/<int:pk>/delete/', views.CategoryDeleteView.as_view(), name='category_delete'),
+    path('archive/', views.ArchivedTaskListView.as_view(), name='archived_task_list'),
     path('export/', views.export_tasks, name='export_tasks'),
+    path('import/', views.import_tasks, name='import_tasks'),
     path('category/<int:category_id>/tasks/', views.task_by_category, name='tasks_by_category'),
     path('calendar/', views.calendar_view, name='task_calendar'),
+    path('calendar/feed/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/feed/rotate/', views.rotate_calendar_feed, name='calendar_feed_rotate'),
+    path('sync/', views.sync_changes, name='sync_changes'),
+    path('snapshot.json', views.task_snapshot, name='task_snapshot'),
+    path('analytics/', views.analytics_view, name='analytics'),
+    path('analytics.json', views.analytics_json, name='analytics_json'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,17 +1,32 @@
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse, Http404
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from lxml import etree
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
-from .models import Task, Category
-from .forms import TaskForm, CategoryForm
+from django.urls import reverse, reverse_lazy
+from .models import Task, Category, ArchivedTask
+from .forms import TaskForm, CategoryForm, TaskImportForm
+from .importers import detect_format, import_file
+from .archive import search_archived
+from .analytics import get_rollups
+from .deletion import delete_series
+from .transitions import BLOCKED, NOT_FOUND, delete_task, toggle_task
+from .ranking import top_tasks
+from .snapshot import get_snapshot
+from .ical import iter_calendar
+from .conditional import user_data_condition
+from .metrics import CONTENT_TYPE, EXPORT_DURATION, RECURRING_CREATED, RECURRING_DURATION, render_metrics
+from .sync import InvalidSyncToken, changes_since, feed_state, make_feed_token, read_feed_token, rotate_feed_token
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
+from django.utils.text import Truncator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
 from django.db.models import Q
+from django.views.decorators.http import condition, require_POST
+from django.utils.decorators import method_decorator
+from django.utils.cache import patch_vary_headers
 
 def generate_svg(tasks):
     response = HttpResponse(content_type='image/svg+xml')
@@ -70,72 +85,144 @@ def generate_pdf(tasks):
     return response
 
 import csv
+import gzip
+import re
 
 def export_tasks(request):
     if request.method == 'POST':
         task_ids = request.POST.getlist('task_ids')
+        archived_ids = request.POST.getlist('archived_ids')
         format = request.POST.get('format')
 
-        if not task_ids:
+        if not task_ids and not archived_ids:
             return redirect('tasks:task_list')
 
         tasks = Task.objects.filter(id__in=task_ids)
-
-        if format == 'pdf':
-            return generate_pdf(tasks)
-        elif format == 'svg':
-            return generate_svg(tasks)
-        elif format == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="tasks.csv"'
-
-            writer = csv.writer(response)
-            writer.writerow(['Completed', 'Title', 'Description', 'Category', 'Due Date'])
-
-            for task in tasks:
-                completed_char = "✔" if task.is_completed else "☐"
-                writer.writerow([
-                    completed_char,
-                    task.title,
-                    task.description,
-                    task.category.name if task.category else '',
-                    task.due_date
-                ])
-
-            return response
+        if archived_ids:
+            archived = ArchivedTask.objects.filter(id__in=archived_ids, user=request.user)
+            tasks = list(tasks) + list(archived)
+
+        with EXPORT_DURATION.time(format=format if format in ('pdf', 'svg', 'csv') else 'other'):
+            if format == 'pdf':
+                return generate_pdf(tasks)
+            elif format == 'svg':
+                return generate_svg(tasks)
+            elif format == 'csv':
+                response = HttpResponse(content_type='text/csv')
+                response['Content-Disposition'] = 'attachment; filename="tasks.csv"'
+
+                writer = csv.writer(response)
+                writer.writerow(['Completed', 'Title', 'Description', 'Category', 'Due Date'])
+
+                for task in tasks:
+                    completed_char = "✔" if task.is_completed else "☐"
+                    writer.writerow([
+                        completed_char,
+                        task.title,
+                        task.description,
+                        task.category.name if task.category else '',
+                        task.due_date
+                    ])
+
+                return response
 
     tasks = Task.objects.filter(user=request.user)
-    return render(request, 'tasks/export_tasks.html', {'tasks': tasks})
+    include_archived = request.GET.get('archived') == '1'
+    archived_tasks = search_archived(request.user) if include_archived else None
+    return render(request, 'tasks/export_tasks.html', {
+        'tasks': tasks,
+        'archived_tasks': archived_tasks,
+        'include_archived': include_archived,
+    })
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from datetime import date
 from dateutil.relativedelta import relativedelta
 import uuid
 
+@login_required
+def import_tasks(request):
+    result = None
+    if request.method == 'POST':
+        form = TaskImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = detect_format(upload.name)
+            if file_format is None:
+                form.add_error('file', 'Please upload a .csv or .ics file.')
+            else:
+                try:
+                    result = import_file(request.user, upload.file, file_format)
+                except (ValueError, csv.Error) as e:
+                    form.add_error('file', f'Could not read file: {e}')
+                else:
+                    if result.created:
+                        messages.success(request, f'Imported {result.created} task(s).', extra_tags='alert-success')
+                    if result.error_count:
+                        messages.warning(request, f'{result.error_count} row(s) could not be imported.', extra_tags='alert-warning')
+                    if result.stream_error:
+                        line, error = result.stream_error
+                        messages.error(request, f'Could not read the file past the row at line {line}: {error}. '
+                                                f'{result.created} task(s) up to that row were imported; '
+                                                f'import only the rows after it to avoid duplicates.',
+                                       extra_tags='alert-danger')
+    else:
+        form = TaskImportForm()
+    return render(request, 'tasks/import_tasks.html', {'form': form, 'result': result})
+
 def _create_recurring_tasks(task, user, recurring_task_id):
     if task.due_date and task.recurrence_end_date:
-        current_date = task.due_date
-        while current_date <= task.recurrence_end_date:
-            Task.objects.create(
-                title=task.title,
-                description=task.description,
-                category=task.category,
-                due_date=current_date,
-                user=user,
-                is_recurring=True,
-                recurrence_frequency=task.recurrence_frequency,
-                recurrence_end_date=task.recurrence_end_date,
-                recurring_task_id=recurring_task_id
-            )
-            if task.recurrence_frequency == 'daily':
-                current_date += relativedelta(days=1)
-            elif task.recurrence_frequency == 'weekly':
-                current_date += relativedelta(weeks=1)
-            elif task.recurrence_frequency == 'monthly':
-                current_date += relativedelta(months=1)
+        with RECURRING_DURATION.time():
+            current_date = task.due_date
+            while current_date <= task.recurrence_end_date:
+                Task.objects.create(
+                    title=task.title,
+                    description=task.description,
+                    category=task.category,
+                    priority=task.priority,
+                    due_date=current_date,
+                    user=user,
+                    is_recurring=True,
+                    recurrence_frequency=task.recurrence_frequency,
+                    recurrence_end_date=task.recurrence_end_date,
+                    recurring_task_id=recurring_task_id
+                )
+                RECURRING_CREATED.inc()
+                if task.recurrence_frequency == 'daily':
+                    current_date += relativedelta(days=1)
+                elif task.recurrence_frequency == 'weekly':
+                    current_date += relativedelta(weeks=1)
+                elif task.recurrence_frequency == 'monthly':
+                    current_date += relativedelta(months=1)
+
+PRIORITY_BADGES = {'high': 'bg-danger', 'medium': 'bg-warning text-dark', 'low': 'bg-success'}
+STATUS_BADGES = {'completed': 'bg-success', 'overdue': 'bg-danger', 'incomplete': 'bg-warning text-dark'}
+
+def _prepare_task_rows(tasks, today):
+    # Work out everything the card and table fragments show once per task, in
+    # Python, instead of once per fragment in the template. Expects subtasks
+    # to be prefetched.
+    tasks = list(tasks)
+    for task in tasks:
+        task.is_overdue = bool(task.due_date and task.due_date < today and not task.is_completed)
+        status = 'completed' if task.is_completed else 'overdue' if task.is_overdue else 'incomplete'
+        task.status_label = status.title()
+        task.status_class = STATUS_BADGES[status]
+        task.priority_class = PRIORITY_BADGES.get((task.priority or '').lower(), 'bg-secondary')
+        task.short_description = Truncator(task.description).words(20, truncate=' …')
+        task.detail_url = reverse('tasks:task_detail', args=[task.pk])
+        task.update_url = reverse('tasks:task_update', args=[task.pk])
+        task.delete_url = reverse('tasks:task_delete', args=[task.pk])
+        task.subtask_list = list(task.subtasks.all())
+        task.subtask_count = len(task.subtask_list)
+        for subtask in task.subtask_list:
+            subtask.detail_url = reverse('tasks:task_detail', args=[subtask.pk])
+    return tasks
 
 # Create your views here.
+@method_decorator(user_data_condition, name='dispatch')
 class TaskListView(LoginRequiredMixin, ListView):
     model = Task
     template_name = 'tasks/task_list.html'
@@ -143,7 +230,8 @@ class TaskListView(LoginRequiredMixin, ListView):
     paginate_by = 6 
 
     def get_queryset(self):
-        queryset = Task.objects.filter(user=self.request.user, parent__isnull=True).select_related('category')
+        queryset = (Task.objects.filter(user=self.request.user, parent__isnull=True)
+                    .select_related('category').prefetch_related('subtasks'))
         search_query = self.request.GET.get('q')
         if search_query:
             queryset = queryset.filter(
@@ -156,6 +244,7 @@ class TaskListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         tasks_query = self.get_queryset()
+        context['tasks'] = _prepare_task_rows(context['tasks'], timezone.now().date())
 
         # Calculate task counts for summary cards
         context['total_tasks'] = tasks_query.count()
@@ -165,7 +254,7 @@ class TaskListView(LoginRequiredMixin, ListView):
         context['today'] = timezone.now().date()
 
         # Get categories
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.objects.filter(user=self.request.user)
         
         # Pass search query to template for preserving it in pagination links
         context['search_query'] = self.request.GET.get('q', '')
@@ -176,6 +265,38 @@ class TaskListView(LoginRequiredMixin, ListView):
 
 
 
+@method_decorator(user_data_condition, name='dispatch')
+class TodayView(LoginRequiredMixin, ListView):
+    model = Task
+    template_name = 'tasks/today.html'
+    context_object_name = 'tasks'
+    limit = 20
+
+    def get_queryset(self):
+        return top_tasks(self.request.user, timezone.now().date(), self.limit)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['today'] = timezone.now().date()
+        return context
+
+
+class ArchivedTaskListView(LoginRequiredMixin, ListView):
+    model = ArchivedTask
+    template_name = 'tasks/archived_task_list.html'
+    context_object_name = 'tasks'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return search_archived(self.request.user, self.request.GET.get('q'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.request.GET.get('q', '')
+        return context
+
+
+@method_decorator(user_data_condition, name='dispatch')
 class TaskDetailView(LoginRequiredMixin, DetailView):
     model = Task
     template_name = 'tasks/task_detail.html'
@@ -251,10 +372,7 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
 
         if self.object.is_recurring:
             # Delete all future recurring tasks with the same recurring_task_id
-            Task.objects.filter(
-                user=self.request.user,
-                recurring_task_id=self.object.recurring_task_id,
-            ).delete()
+            delete_series(self.request.user, self.object.recurring_task_id)
 
             _create_recurring_tasks(self.object, self.request.user, self.object.recurring_task_id)
             return redirect(self.success_url)
@@ -271,13 +389,16 @@ class TaskDeleteView(LoginRequiredMixin, DeleteView):
         return Task.objects.filter(user=self.request.user)
 
     def post(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        if self.object.subtasks.filter(is_completed=False).exists():
+        outcome = delete_task(kwargs['pk'], request.user)
+        if outcome == NOT_FOUND:
+            raise Http404('No task found matching the query')
+        if outcome == BLOCKED:
             messages.error(request, 'Cannot delete a parent task with incomplete subtasks.', extra_tags='alert-danger')
             return redirect('tasks:task_list')
         messages.success(request, 'Task deleted successfully.', extra_tags='alert-success')
-        return super().post(request, *args, **kwargs)
+        return HttpResponseRedirect(self.success_url)
 
+@method_decorator(user_data_condition, name='dispatch')
 class CategoryListView(LoginRequiredMixin, ListView):
     model = Category
     template_name = 'tasks/category_list.html'
@@ -298,6 +419,7 @@ class CategoryCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 @login_required
+@user_data_condition
 def task_by_category(request, category_id):
     tasks = Task.objects.filter(category_id=category_id, user=request.user)
     category = get_object_or_404(Category, id=category_id)
@@ -307,18 +429,19 @@ def task_by_category(request, category_id):
     })
 
 @login_required
+@require_POST
 def toggle_complete(request, pk):
-    task = get_object_or_404(Task, pk=pk, user=request.user)
-    # Prevent completing a parent task if it has incomplete subtasks
-    if not task.is_completed and task.subtasks.filter(is_completed=False).exists():
+    # Completing a parent task with incomplete subtasks is refused
+    outcome = toggle_task(pk, request.user)
+    if outcome == NOT_FOUND:
+        raise Http404('No task found matching the query')
+    if outcome == BLOCKED:
         messages.error(request, 'Cannot complete a parent task with incomplete subtasks.', extra_tags='alert-danger')
-        return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse('tasks:task_list')))
-    task.is_completed = not task.is_completed
-    task.save()
     return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse('tasks:task_list')))
 
 # Calendar view for tasks
 @login_required
+@user_data_condition
 def calendar_view(request):
     import json
     from django.utils.timezone import now
@@ -346,7 +469,81 @@ def calendar_view(request):
                 'class': task_class,
             })
     events_json = json.dumps(events)
-    return render(request, 'tasks/calendar.html', {'events_json': events_json, 'tasks': tasks})
+    feed_url = request.build_absolute_uri(reverse('tasks:calendar_feed', args=[make_feed_token(request.user)]))
+    return render(request, 'tasks/calendar.html', {'events_json': events_json, 'tasks': tasks, 'feed_url': feed_url})
+
+@login_required
+@require_POST
+def rotate_calendar_feed(request):
+    rotate_feed_token(request.user)
+    messages.success(request, 'Your calendar subscription link was replaced. The old link no longer works.', extra_tags='alert-success')
+    return redirect('tasks:task_calendar')
+
+@login_required
+def sync_changes(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', 500)), 1), 1000)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+    try:
+        payload = changes_since(request.user, request.GET.get('token') or None, limit=limit)
+    except InvalidSyncToken as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(payload)
+
+def _accepts_gzip(request):
+    # Honours q-values: "gzip;q=0" refuses gzip, "*" covers it when unlisted
+    qualities = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = re.search(r'\bq\s*=\s*([0-9.]+)', params)
+        try:
+            qualities[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            qualities[coding] = 0.0
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+@login_required
+@user_data_condition(variant=lambda request: 'gz' if _accepts_gzip(request) else 'identity')
+def task_snapshot(request):
+    # Compact columnar copy of the user's tasks for filtering in the browser;
+    # see tasks/snapshot.py for the format
+    body = get_snapshot(request.user)
+    if _accepts_gzip(request):
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(body), content_type='application/json')
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+def _feed_user_id(request, token):
+    if not hasattr(request, '_feed_state'):
+        user_id = read_feed_token(token)
+        if user_id is None:
+            raise Http404
+        request._feed_state = (user_id, *feed_state(user_id))
+    return request._feed_state
+
+@condition(
+    etag_func=lambda request, token: _feed_user_id(request, token)[1],
+    last_modified_func=lambda request, token: _feed_user_id(request, token)[2],
+)
+def calendar_feed(request, token):
+    # iCalendar subscription for external calendar clients. The token in the
+    # URL stands in for a login; unchanged calendars are answered with a 304.
+    user_id = _feed_user_id(request, token)[0]
+    tasks = Task.objects.filter(user_id=user_id).select_related('category').order_by('id')
+    response = StreamingHttpResponse(
+        iter_calendar(tasks.iterator(chunk_size=500), domain=request.get_host()),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="planwise.ics"'
+    return response
     
 
 class CategoryUpdateView(LoginRequiredMixin, UpdateView):
@@ -374,4 +571,35 @@ class CategoryDeleteView(LoginRequiredMixin, DeleteView):
             messages.error(request, 'Cannot delete category with associated tasks. Please remove tasks first.', extra_tags='alert-danger')
             return redirect('tasks:category_list')
         messages.success(request, 'Category deleted successfully.', extra_tags='alert-success')
-        return super().post(request, *args, **kwargs)
\ No newline at end of file
+        return super().post(request, *args, **kwargs)
+
+@login_required
+def analytics_view(request):
+    rollups = get_rollups(request.user)
+    category_ids = list(rollups['categories'])
+    weekly = rollups['weekly']
+    weekly_rows = [
+        (week, [weekly['by_category'][cid][i] for cid in category_ids], weekly['recurring'][i])
+        for i, week in enumerate(weekly['weeks'])
+    ]
+    categories = [
+        dict(rollups['categories'][cid], name=rollups['category_names'][cid], completion_percent=round(rollups['categories'][cid]['completion_rate'] * 100))
+        for cid in category_ids
+    ]
+    trend = rollups['overdue_trend']
+    return render(request, 'tasks/analytics.html', {
+        'totals': rollups['totals'],
+        'categories': categories,
+        'weekly_rows': weekly_rows,
+        'overdue_trend': list(zip(trend['dates'], trend['overdue'])),
+        'overdue_max': max(trend['overdue']) or 1,
+    })
+
+@login_required
+def analytics_json(request):
+    return JsonResponse(get_rollups(request.user))
+
+
+@staff_member_required
+def metrics_view(request):
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)